@@ -0,0 +1,115 @@
+"""
+解析进程池基准：比较页面解析期间 Qt 事件循环的延迟
+
+主线程运行 Qt 事件循环，每 TICK_MS 毫秒触发一次定时器并记录实际触发时间与预期时间的偏差；
+后台 4 个线程（与 PriceScraper 相同的并发度）同时解析若干个大页面，分别在
+  - inproc：抓取线程内直接解析（持有 GIL，与事件循环争抢）
+  - pool：交给常驻解析进程池（抓取线程只等待结果）
+两种模式下运行，输出事件循环延迟的 p50/p95/最大值以及解析总耗时。无需网络。
+
+用法：python bench/bench_parse_pool.py [--pages 16] [--listings 3000] [--workers 2] [--backend html.parser]
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+TICK_MS = 5
+
+
+def build_page(listings):
+    """生成 uu898 结构的列表页（首条商品块之前有大量其他内容，快速提取关闭时需完整建树）"""
+    filler = ''.join(f'<div class="row"><span class="n">{i}</span><p>说明文字 {i}</p></div>' for i in range(listings))
+    items = ''.join(f'<li class="sp_li1"><h6>{0.5 + i / 1000:.4f} 元/个</h6><span>库存 {i}</span></li>'
+                    for i in range(20))
+    return f'<html><head><meta charset="utf-8"></head><body>{filler}<ul>{items}</ul></body></html>'
+
+
+def _percentile(values, q):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+def run_mode(app, mode, html, pages, workers, backend, fast_path):
+    from PyQt5.QtCore import QTimer
+    from modules.price_sources import parse_price
+    from modules.price_parse_pool import get_parse_pool
+
+    pool = get_parse_pool(workers) if mode == 'pool' else None
+    if pool is not None:
+        # 预热：确保子进程已启动并完成初始化，计时只包含稳态解析
+        for _ in range(workers):
+            pool.parse('warmup', 'uu898', '<html></html>', backend, fast_path)
+
+    lateness = []
+    expected = [time.perf_counter() + TICK_MS / 1000.0]
+
+    def on_tick():
+        now = time.perf_counter()
+        lateness.append(max(0.0, now - expected[0]) * 1000)
+        expected[0] = now + TICK_MS / 1000.0
+
+    timer = QTimer()
+    timer.setInterval(TICK_MS)
+    timer.timeout.connect(on_tick)
+
+    def parse_one():
+        if pool is not None:
+            return pool.parse('divine', 'uu898', html, backend, fast_path)[2]
+        return parse_price('uu898', html, backend, fast_path)
+
+    executor = ThreadPoolExecutor(max_workers=4)
+    started = time.perf_counter()
+    timer.start()
+    futures = [executor.submit(parse_one) for _ in range(pages)]
+    while not all(f.done() for f in futures):
+        app.processEvents()
+        time.sleep(0.001)
+    elapsed = time.perf_counter() - started
+    timer.stop()
+    executor.shutdown()
+    results = [f.result() for f in futures]
+    assert all(abs(p - 0.5) < 1e-9 for p in results), results
+    return {
+        "mode": mode,
+        "elapsed": elapsed,
+        "ticks": len(lateness),
+        "p50": _percentile(lateness, 0.50),
+        "p95": _percentile(lateness, 0.95),
+        "max": max(lateness) if lateness else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pages', type=int, default=16)
+    parser.add_argument('--listings', type=int, default=3000)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--backend', default='html.parser', choices=['html.parser', 'lxml'])
+    parser.add_argument('--fast-path', action='store_true', help='启用免建树快速提取（默认关闭，以测量完整建树的影响）')
+    args = parser.parse_args()
+
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PyQt5.QtCore import QCoreApplication
+    app = QCoreApplication.instance() or QCoreApplication(sys.argv)
+
+    html = build_page(args.listings)
+    print(f"page={len(html.encode('utf-8')) / 1024:.0f}KB pages={args.pages} backend={args.backend} "
+          f"fast_path={args.fast_path} workers={args.workers} tick={TICK_MS}ms")
+    for mode in ('inproc', 'pool'):
+        r = run_mode(app, mode, html, args.pages, args.workers, args.backend, args.fast_path)
+        print(f"{r['mode']:>7}: total={r['elapsed'] * 1000:.0f}ms ticks={r['ticks']} "
+              f"loop_lateness p50={r['p50']:.1f}ms p95={r['p95']:.1f}ms max={r['max']:.1f}ms")
+
+    from modules.price_parse_pool import close_parse_pool
+    close_parse_pool()
+
+
+if __name__ == '__main__':
+    main()
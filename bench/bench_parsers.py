@@ -0,0 +1,199 @@
+"""
+站点解析基准与正确性检查（离线）
+
+读取 bench/fixtures/manifest.json 中登记的页面样本（正常列表页、布局变体、挑战页），按
+  - 后端：lxml（预编译 XPath） / html.parser（soupsieve CSS）
+  - 策略：dom（只建树）、fast（免建树快速提取，不明确时建树）、quotes（建树并提取前 N 条报价）
+逐一组合解析全部样本，输出每个组合的吞吐（页/秒、MB/秒）、tracemalloc 统计的单页峰值内存与解析后仍存活的
+新增内存块数（lxml 的树在 C 层分配，不计入 tracemalloc），以及与 manifest 预期结果的比对。
+任一组合结果不符时以退出码 1 结束，可在发布前作为解析回归检查。无需网络。
+
+manifest 每项：file、site、kind（listing / variant / challenge）、price（预期价格，取不到为 0）、
+quotes（可选，预期的前 N 条 [单价, 库存]；未给出时视为无报价）、note（说明）。
+页面以原始字节保存，按与抓取时相同的方式（CharsetResolver）解码。
+
+用法：
+  python bench/bench_parsers.py [--iterations 20] [--site uu898] [--backend lxml] [--strategy fast]
+  python bench/bench_parsers.py --record dd373:divine   # 联网抓取一个页面加入样本（预期值取当前解析结果，需人工核对）
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+MANIFEST = os.path.join(FIXTURE_DIR, 'manifest.json')
+
+BACKENDS = ('lxml', 'html.parser')
+QUOTE_DEPTH = 10
+# 策略名 -> (fast_path, quote_depth)
+STRATEGIES = {
+    'dom': (False, 0),
+    'fast': (True, 0),
+    'quotes': (True, QUOTE_DEPTH),
+}
+
+
+def load_manifest():
+    with open(MANIFEST, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def load_fixtures(entries):
+    """返回 [(entry, html, raw_size)]，解码方式与抓取时一致"""
+    from modules.charset_resolver import CharsetResolver
+    resolver = CharsetResolver()
+    fixtures = []
+    for entry in entries:
+        with open(os.path.join(FIXTURE_DIR, entry['file']), 'rb') as f:
+            raw = f.read()
+        html = resolver.decode('http://fixture.local/', entry.get('content_type', 'text/html'), raw)
+        fixtures.append((entry, html, len(raw)))
+    return fixtures
+
+
+def check(entry, html, price, quotes, quote_depth):
+    """与预期比对，返回不符项的说明列表"""
+    from modules.price_sources import is_challenge_page
+    problems = []
+    if abs(price - entry['price']) > 1e-9:
+        problems.append(f"price={price} expected={entry['price']}")
+    if quote_depth > 0:
+        expected = [tuple(q) for q in entry.get('quotes', [])][:quote_depth]
+        if list(quotes) != expected:
+            problems.append(f"quotes={list(quotes)[:3]}... expected={expected[:3]}...")
+    challenged = is_challenge_page(html, entry['site'])
+    if challenged != (entry['kind'] == 'challenge'):
+        problems.append(f"is_challenge={challenged}")
+    return problems
+
+
+def run_combo(fixtures, backend, strategy, iterations):
+    from modules.price_sources import parse_page
+    fast_path, quote_depth = STRATEGIES[strategy]
+
+    failures = []
+    for entry, html, _size in fixtures:
+        price, quotes = parse_page(entry['site'], html, backend, fast_path, quote_depth)
+        for problem in check(entry, html, price, quotes, quote_depth):
+            failures.append(f"{entry['file']}: {problem}")
+
+    # 分配统计单独跑一遍，避免 tracemalloc 的开销计入吞吐
+    peaks, blocks = [], []
+    tracemalloc.start()
+    try:
+        for entry, html, _size in fixtures:
+            before = tracemalloc.take_snapshot()
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+            parse_page(entry['site'], html, backend, fast_path, quote_depth)
+            peaks.append(tracemalloc.get_traced_memory()[1] - base)
+            after = tracemalloc.take_snapshot()
+            blocks.append(sum(max(0, s.count_diff) for s in after.compare_to(before, 'filename')))
+    finally:
+        tracemalloc.stop()
+
+    total_bytes = sum(size for _entry, _html, size in fixtures)
+    started = time.perf_counter()
+    for _ in range(iterations):
+        for entry, html, _size in fixtures:
+            parse_page(entry['site'], html, backend, fast_path, quote_depth)
+    elapsed = time.perf_counter() - started
+    pages = len(fixtures) * iterations
+    return {
+        "backend": backend,
+        "strategy": strategy,
+        "pages_per_s": pages / elapsed if elapsed else 0.0,
+        "mb_per_s": total_bytes * iterations / elapsed / 1e6 if elapsed else 0.0,
+        "peak_kb": max(peaks) / 1024 if peaks else 0.0,
+        "avg_peak_kb": sum(peaks) / len(peaks) / 1024 if peaks else 0.0,
+        "live_blocks": max(blocks) if blocks else 0,
+        "failures": failures,
+    }
+
+
+def record(target):
+    """联网抓取 site:currency 对应的页面，写入样本目录并以当前解析结果登记预期值"""
+    import requests
+    from modules.price_registry import get_price_registry
+    from modules.price_sources import parse_page, is_challenge_page
+    from modules.price_monitor import PriceScraper
+    from modules.charset_resolver import CharsetResolver
+
+    site, _, currency = target.partition(':')
+    spec = get_price_registry().site(site)
+    url = spec.url_for(currency) if spec is not None else None
+    if not url:
+        sys.exit(f"unknown source: {target}")
+    resp = requests.get(url, headers=PriceScraper._build_headers(url), timeout=15)
+    raw = resp.content
+    content_type = resp.headers.get('Content-Type', 'text/html')
+    html = CharsetResolver().decode(url, content_type, raw)
+    price, quotes = parse_page(site, html, 'lxml', False, QUOTE_DEPTH)
+    kind = 'challenge' if is_challenge_page(html, site) else 'listing'
+
+    name = f"{site}_{currency}_{time.strftime('%Y%m%d%H%M%S')}.html"
+    with open(os.path.join(FIXTURE_DIR, name), 'wb') as f:
+        f.write(raw)
+    entries = load_manifest()
+    entries.append({"file": name, "site": site, "kind": kind, "price": price,
+                    "quotes": [list(q) for q in quotes], "content_type": content_type,
+                    "note": f"recorded from {url}"})
+    with open(MANIFEST, 'w', encoding='utf-8', newline='\n') as f:
+        json.dump(entries, f, ensure_ascii=False, indent=2)
+        f.write('\n')
+    print(f"recorded {name}: status={resp.status_code} {len(raw)}B kind={kind} price={price} quotes={len(quotes)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--site', help='只测试该站点的样本')
+    parser.add_argument('--backend', choices=BACKENDS, help='只测试该后端')
+    parser.add_argument('--strategy', choices=list(STRATEGIES), help='只测试该策略')
+    parser.add_argument('--record', metavar='SITE:CURRENCY', help='联网抓取一个页面加入样本后退出')
+    args = parser.parse_args()
+
+    if args.record:
+        record(args.record)
+        return 0
+
+    from modules.price_sources import lxml_available
+    entries = [e for e in load_manifest() if not args.site or e['site'] == args.site]
+    if not entries:
+        sys.exit("no fixtures selected")
+    fixtures = load_fixtures(entries)
+    backends = [b for b in BACKENDS if not args.backend or b == args.backend]
+    if 'lxml' in backends and not lxml_available():
+        print("lxml not installed; skipping lxml backend")
+        backends.remove('lxml')
+    strategies = [s for s in STRATEGIES if not args.strategy or s == args.strategy]
+
+    kinds = {}
+    for entry in entries:
+        kinds[entry['kind']] = kinds.get(entry['kind'], 0) + 1
+    total_kb = sum(size for _entry, _html, size in fixtures) / 1024
+    print(f"fixtures={len(fixtures)} ({', '.join(f'{k}={n}' for k, n in sorted(kinds.items()))}) "
+          f"size={total_kb:.0f}KB iterations={args.iterations}")
+
+    failed = False
+    for backend in backends:
+        for strategy in strategies:
+            r = run_combo(fixtures, backend, strategy, args.iterations)
+            status = 'ok' if not r['failures'] else f"FAIL({len(r['failures'])})"
+            print(f"{backend:>11}/{strategy:<6} {r['pages_per_s']:8.0f} pages/s {r['mb_per_s']:7.1f} MB/s "
+                  f"peak={r['peak_kb']:.0f}KB avg_peak={r['avg_peak_kb']:.0f}KB "
+                  f"live_blocks={r['live_blocks']} {status}")
+            for failure in r['failures']:
+                print(f"    {failure}")
+            failed = failed or bool(r['failures'])
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,114 @@
+"""
+内存价格序列基准：环形缓冲区（array('d')）与 list-of-dicts 基线对比
+
+两种结构保存相同的价格序列（容量满后丢弃最旧的一条）：
+  - ring：modules.price_ticks.TickRing，时间戳与价格存放在预分配的 array('d') 中，按时间 bisect 定位，区间为 memoryview
+  - dicts：[{"ts": ..., "price": ...}, ...]，超出容量时删除表头，按时间线性扫描
+输出每条记录的内存（tracemalloc 统计）、单次追加耗时，以及按时间窗口取价格（最近 1 小时 / 24 小时）的耗时。无需网络。
+
+用法：python bench/bench_ticks.py [--capacity 4096] [--ticks 100000] [--queries 2000]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+TICK_SECONDS = 600  # 与默认刷新间隔相当的时间步长
+
+
+def make_series(ticks):
+    random.seed(1)
+    price, now = 0.5, 1.7e9
+    series = []
+    for i in range(ticks):
+        price = max(0.01, price * (1 + random.gauss(0, 0.01)))
+        series.append((now + i * TICK_SECONDS, price))
+    return series
+
+
+class DictSeries:
+    """基线：list-of-dicts，容量满后删除最旧的一条"""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.items = []
+
+    def append(self, price, ts):
+        self.items.append({"ts": ts, "price": price})
+        if len(self.items) > self.capacity:
+            del self.items[0]
+
+    def prices(self, start, end):
+        return [item["price"] for item in self.items if start <= item["ts"] <= end]
+
+
+def measure_memory(factory, series):
+    tracemalloc.start()
+    try:
+        base = tracemalloc.get_traced_memory()[0]
+        store = factory()
+        for ts, price in series:
+            store.append(price, ts)
+        used = tracemalloc.get_traced_memory()[0] - base
+    finally:
+        tracemalloc.stop()
+    return used, store
+
+
+def measure_append(factory, series):
+    store = factory()
+    started = time.perf_counter()
+    for ts, price in series:
+        store.append(price, ts)
+    return (time.perf_counter() - started) / len(series), store
+
+
+def measure_window(store, last_ts, window, queries):
+    started = time.perf_counter()
+    total = 0
+    for i in range(queries):
+        end = last_ts - (i % 10) * TICK_SECONDS
+        total += len(store.prices(end - window, end))
+    return (time.perf_counter() - started) / queries, total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--capacity', type=int, default=4096)
+    parser.add_argument('--ticks', type=int, default=100000)
+    parser.add_argument('--queries', type=int, default=2000)
+    args = parser.parse_args()
+
+    from modules.price_ticks import TickRing
+    factories = {
+        'ring': lambda: TickRing(args.capacity),
+        'dicts': lambda: DictSeries(args.capacity),
+    }
+    series = make_series(args.ticks)
+    filled = series[:args.capacity]
+    last_ts = series[-1][0]
+    print(f"capacity={args.capacity} ticks={args.ticks} queries={args.queries}")
+
+    results = {}
+    for name, factory in factories.items():
+        used, _store = measure_memory(factory, filled)
+        per_append, store = measure_append(factory, series)
+        hour, hour_n = measure_window(store, last_ts, 3600, args.queries)
+        day, day_n = measure_window(store, last_ts, 86400, args.queries)
+        results[name] = (hour_n, day_n, store.prices(series[0][0], last_ts))
+        print(f"{name:>5}: memory={used / len(filled):6.1f}B/tick ({used / 1024:.0f}KB) "
+              f"append={per_append * 1e9:6.0f}ns window_1h={hour * 1e6:7.1f}us window_24h={day * 1e6:7.1f}us")
+
+    if len({(h, d, tuple(p)) for h, d, p in results.values()}) != 1:
+        print("MISMATCH: ring and dicts returned different windows")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -4,6 +4,7 @@ POE2PriceAid 主程序入口
 
 import os
 import sys
+import multiprocessing
 from PyQt5.QtWidgets import QApplication
 from PyQt5.QtCore import Qt, QTimer
 
@@ -72,4 +73,6 @@ def main():
 
 
 if __name__ == "__main__":
+    # 打包后的程序中，价格解析进程池以 spawn 方式启动子进程，需要 freeze_support 接管子进程入口
+    multiprocessing.freeze_support()
     main()
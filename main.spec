@@ -49,6 +49,10 @@ a = Analysis(
         'bs4',
         'chardet',
         'urllib3',
+        'httpx',
+        'h2',
+        'brotli',
+        'zstandard',
         'lxml',
         'py7zr',
         'psutil',
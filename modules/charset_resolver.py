@@ -0,0 +1,115 @@
+"""
+页面字符集解析
+依次检查响应头、BOM、前几 KB 内的 <meta charset>，再查按主机缓存的上次结果，
+最后才对有限长度的前缀做统计探测（代替 requests 对整页运行 chardet 的 apparent_encoding）
+"""
+
+import codecs
+import re
+import threading
+import time
+from urllib.parse import urlsplit
+
+from modules.config import Config
+
+
+_CONTENT_TYPE_CHARSET = re.compile(r'charset\s*=\s*["\']?([\w.:-]+)', re.I)
+_META_CHARSET = re.compile(rb'<meta[^>]+?charset\s*=\s*["\']?\s*([\w.:-]+)', re.I)
+_BOMS = (
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16-le'),
+    (codecs.BOM_UTF16_BE, 'utf-16-be'),
+)
+# 按浏览器惯例，GB2312/GBK 声明的页面实际按 GB18030 解码，避免生僻字乱码
+_ALIASES = {'gb2312': 'gb18030', 'gbk': 'gb18030'}
+
+# 统计来源
+SOURCES = ('header', 'bom', 'meta', 'host_cache', 'detect', 'fallback')
+
+
+def _normalize(name):
+    if not name:
+        return None
+    try:
+        enc = codecs.lookup(name.strip().lower()).name
+    except LookupError:
+        return None
+    return _ALIASES.get(enc, enc)
+
+
+class CharsetResolver:
+    """线程安全的字符集解析器，带按主机缓存与耗时统计"""
+
+    def __init__(self, sniff_bytes=4096, detect_cap=32768):
+        self.sniff_bytes = sniff_bytes  # 查找 BOM / <meta charset> 的前缀长度
+        self.detect_cap = detect_cap    # 统计探测最多使用的字节数
+        self._lock = threading.Lock()
+        self._host_cache = {}
+        self._counts = dict.fromkeys(SOURCES, 0)
+        self._elapsed = dict.fromkeys(SOURCES, 0.0)
+
+    def resolve(self, url, content_type, raw):
+        """返回 (encoding, source)"""
+        started = time.perf_counter()
+        host = urlsplit(url).hostname or ''
+        enc, source = self._resolve(host, content_type, raw)
+        with self._lock:
+            if source != 'host_cache' and source != 'fallback':
+                self._host_cache[host] = enc
+            self._counts[source] += 1
+            self._elapsed[source] += time.perf_counter() - started
+        return enc, source
+
+    def _resolve(self, host, content_type, raw):
+        m = _CONTENT_TYPE_CHARSET.search(content_type or '')
+        enc = _normalize(m.group(1)) if m else None
+        if enc:
+            return enc, 'header'
+        for bom, name in _BOMS:
+            if raw.startswith(bom):
+                return name, 'bom'
+        m = _META_CHARSET.search(raw[:self.sniff_bytes])
+        enc = _normalize(m.group(1).decode('ascii', 'ignore')) if m else None
+        if enc:
+            return enc, 'meta'
+        with self._lock:
+            enc = self._host_cache.get(host)
+        if enc:
+            return enc, 'host_cache'
+        try:
+            import chardet
+            enc = _normalize(chardet.detect(raw[:self.detect_cap]).get('encoding'))
+        except Exception:
+            enc = None
+        if enc:
+            return enc, 'detect'
+        return 'utf-8', 'fallback'
+
+    def decode(self, url, content_type, raw):
+        enc, _source = self.resolve(url, content_type, raw or b'')
+        return (raw or b'').decode(enc, errors='replace')
+
+    def format_stats(self):
+        with self._lock:
+            counts = ' '.join(f"{s}={self._counts[s]}" for s in SOURCES)
+            total_ms = sum(self._elapsed.values()) * 1000
+            detect_ms = self._elapsed['detect'] * 1000
+        return f"{counts} (detect {detect_ms:.1f}ms, total {total_ms:.1f}ms)"
+
+
+# 全局实例（按主机缓存跨刷新周期共享）
+_charset_resolver = None
+_charset_resolver_lock = threading.Lock()
+
+
+def get_charset_resolver():
+    global _charset_resolver
+    if _charset_resolver is None:
+        with _charset_resolver_lock:
+            if _charset_resolver is None:
+                cfg = Config.PRICE_SCRAPER
+                _charset_resolver = CharsetResolver(
+                    sniff_bytes=cfg.get("charset_sniff_bytes", 4096),
+                    detect_cap=cfg.get("charset_detect_cap", 32768),
+                )
+    return _charset_resolver
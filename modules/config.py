@@ -95,6 +95,204 @@ class Config:
         "chance": 0.0,    # 机会石默认价格
     }
     
+    # 价格抓取配置
+    PRICE_SCRAPER = {
+        "backend": "thread",          # 抓取后端：thread（线程池，默认）/ async（单事件循环，需安装 httpx）
+        "servers": [],                # 每轮刷新的区服（PRICE_SERVERS 中的标识），为空时刷新全部区服
+        "max_workers": 4,             # 线程后端同时进行的 区服×货币 任务数
+        "per_host_limit": 2,          # 每个主机的最大并发请求数（两种后端）；同一轮内相同 URL 只下载一次
+        "refresh_deadline": 10.0,     # 单轮刷新的截止时间（秒），逐请求压缩超时，到点发出已拿到的价格；0 表示不限制
+        "hedge_mode": "off",          # 对冲抓取（线程后端）：off 依次尝试 / hedge 超时后并行启动下一来源 / race 全部同时启动
+        "hedge_delay_ms": 1500,       # hedge 模式下启动下一来源前的等待时间，同时作为低优先级结果等待高优先级来源的宽限
+        "conditional_get": True,      # 发送 If-None-Match / If-Modified-Since，304 时复用上次价格
+        "validator_max_age": 86400,   # 条件请求缓存的有效期（秒），过期后强制完整下载一次
+        "adaptive_order": True,       # 按来源健康度（成功率/延迟/挑战页比例）动态决定每种货币的尝试顺序
+        "health_window": 50,          # 每个来源保留的最近样本数
+        "health_priority_bias": 0.15, # 静态优先级加权，分数接近时保持 DD373 → UU898 → 7881 的原顺序
+        "health_explore_ratio": 0.1,  # 按该概率保持静态顺序，让被降级的来源定期重新采样
+        "circuit_breaker": True,      # 站点熔断：连续失败/挑战页达到阈值后暂停请求该站点
+        "breaker_threshold": 3,       # 连续失败的刷新轮数阈值（每轮每个站点最多计一次；全部站点建连失败视为本机断网，不计）
+        "breaker_cooldown": 90,       # 熔断后首次半开探测前的冷却时间（秒），应小于最短刷新间隔（PRICE_SCHEDULE 的 min）
+        "breaker_max_cooldown": 7200, # 探测连续失败时冷却时间翻倍的上限（秒）
+        "stream_mode": False,         # 流式读取（线程后端）：读到目标商品块即停止下载；提前断开的连接不能复用
+        "stream_byte_caps": {         # 流式读取时每个站点的最大下载字节数
+            "dd373": 1024 * 1024,
+            "uu898": 512 * 1024,
+            "7881": 512 * 1024,
+            "default": 1024 * 1024,
+        },
+        "challenge_sniff_bytes": 8192,  # 在响应体前多少字节内检查挑战页特征，命中且其中没有列表内容时中止下载并换下一来源（两种后端、两种读取模式）
+        "parse_backend": "lxml",      # 页面解析后端："lxml"（预编译 XPath）或 "html.parser"；lxml 不可用时自动回退
+        "parse_processes": 0,         # 解析进程数：>0 时把页面解析放到常驻子进程中执行，避免解析时界面卡顿；0 为在抓取线程内解析
+        "quote_depth": 0,             # >0 时每个页面一次建树提取前 N 条报价（单价、库存），用于深度/中位数/价差；需建树且流式读取要读到第 N 条，默认关闭
+        "fast_path": True,            # 先用锚定正则在原始 HTML 上直接提取价格，结果不明确时才建树解析（提取多条报价时需建树，仅在 quote_depth 为 0 时生效）
+        "charset_sniff_bytes": 4096,  # 在页面前多少字节内查找 BOM / <meta charset>
+        "charset_detect_cap": 32768,  # 以上均未确定字符集时，统计探测最多使用的字节数
+    }
+    
+    # 价格历史：每个被采纳的价格写入应用数据目录下的 SQLite 数据库（WAL 模式，后台写线程攒批提交）
+    PRICE_HISTORY = {
+        "enabled": True,
+        "filename": "price_history.sqlite3",
+        "batch_size": 200,        # 每批最多写入的条数
+        "flush_interval": 2.0,    # 攒批最长等待秒数
+        "raw_retention_days": 30,     # 原始价格保留天数（更早的只保留小时/日 OHLC 汇总）；0 为永久保留
+        "hourly_retention_days": 365, # 小时汇总保留天数（更早的只保留日汇总）；0 为永久保留
+        "compact_interval": 60,       # 后台汇总与清理的间隔（秒），有积压时空闲即继续
+    }
+    
+    # 内存价格序列：每个 区服×货币 保留的最近价格条数（环形缓冲区，每条 16 字节）
+    PRICE_TICKS = {
+        "capacity": 4096,
+    }
+    
+    # 价格滚动统计：EWMA 均线半衰期、涨跌幅的对比窗口、最低/最高价窗口（秒）
+    PRICE_STATS = {
+        "ewma_half_life": 3600,
+        "change_windows": [3600, 86400],
+        "extremes_window": 86400,
+    }
+    
+    # 按货币的价格刷新间隔（秒）：interval 为初始间隔，min/max 为自适应上下限（相同或省略时间隔固定）
+    # 一轮刷新中价格相对变化达到 adapt_threshold 时间隔乘以 shrink，否则乘以 grow；未配置的货币使用 default
+    PRICE_SCHEDULE = {
+        "default": {"interval": 600, "min": 300, "max": 1200},
+        "divine": {"interval": 300, "min": 120, "max": 900},
+        "chance": {"interval": 1200, "min": 600, "max": 3600},
+        "adapt_threshold": 0.01,
+        "shrink": 0.5,
+        "grow": 1.5,
+    }
+    
+    # 价格抓取重试策略（按来源覆盖 default）：可重试的错误类别与状态码、最大尝试次数、全抖动指数退避
+    # 错误类别：connect 建连失败/连接被重置，timeout 读超时，protocol 传输中断/解压错误
+    PRICE_RETRY = {
+        "default": {
+            "max_attempts": 2,
+            "base_delay": 0.3,          # 退避基数（秒），第 n 次重试前等待 [0, base*2^(n-1)] 内的随机时间
+            "max_delay": 2.0,           # 单次退避上限（秒）
+            "retry_on": ["connect", "protocol", "timeout"],
+            "retry_statuses": [429, 500, 502, 503, 504],
+            "min_budget": 1.0,          # 退避后刷新剩余时间不足该秒数时放弃重试，直接回退到下一来源
+        },
+        "dd373": {
+            "retry_on": ["connect", "protocol"],  # 挑战页频繁，超时不重试，避免加重封禁
+        },
+    }
+    
+    # 反爬挑战页的全局特征（阿里云 WAF 的 acw_sc__v2、滑块/人机验证、Cloudflare 等），只检查页面前 8KB
+    PRICE_CHALLENGE_SIGNATURES = [
+        "acw_sc__v2", "arg1=", "_waf_", "cf-chl", "captcha", "滑块验证", "安全验证", "人机验证",
+    ]
+    
+    # 价格区服：区服标识 -> 显示名称（价格页可切换区服，顺序即显示顺序）
+    PRICE_SERVERS = {
+        "default": "默认区服",
+    }
+    
+    # 价格来源注册表（站点顺序即默认尝试顺序），可在应用数据目录的 price_sources.json 中按站点覆盖或新增站点
+    # - url：URL 模板，{item} 替换为 items 中对应货币的商品编码，{server} 替换为 servers 中对应区服的 URL 片段；
+    #   items 中出现的货币、servers 中出现的区服即由该站点提供（模板不含 {server} 时只提供默认区服）
+    # - selectors：有序选择器链，依次尝试直到取到价格。css 供 html.parser 后端使用，xpath 供 lxml 后端使用（两者须等价，
+    #   xpath 中可用 @class~='x' 表示 class 含 x）；text 为 strip（各文本段去空白后直接拼接）或 strings（以空格拼接）；
+    #   value 为从元素文本中提取价格的正则
+    # - fallback：选择器链均未取到价格时在整页上匹配的正则
+    # - fast_path：免建树快速提取。anchor 为列表容器 [tag, class]，block 为商品块 [tag, class]，取 anchor 之后第 index 个；
+    #   element 为块内价格元素（可按 classes 过滤、取第 nth 个、要求包含 contains），text=True 时先去掉标签再匹配 value。
+    #   流式读取时 block 的第 index 个闭合即停止下载（可用 stream_target 单独指定 [tag, class, 个数]）
+    # - quotes：多条报价提取。row 依次定位每条商品（css/xpath），price 为商品内的单价选择器（xpath 以 .// 相对商品），
+    #   stock 为在商品文本中提取库存数量的正则；与 selectors 共用同一次建树
+    # - challenge_signatures：该站点额外的挑战页特征
+    PRICE_SOURCES = {
+        "dd373": {
+            "url": "https://www.dd373.com/s-bcntax-c-{item}-{server}-5g0bqf.html",
+            "items": {"divine": "n80v8p", "exalted": "bkfnrd", "chaos": "mxgtdd", "chance": "apww35"},
+            "servers": {"default": "h32hgr"},
+            # 第二条商品的价格；该站常见 JS 挑战页，命中挑战页时选择器取不到元素
+            "selectors": [
+                {"css": "div.good-list-box div:nth-child(2) div.p-r66 p.font12.color666.m-t5",
+                 "xpath": "(//div[@class~='good-list-box']//div[count(preceding-sibling::*) = 1]//div[@class~='p-r66']"
+                          "//p[@class~='font12' and @class~='color666' and @class~='m-t5'])[1]",
+                 "text": "strip", "value": r"(\d+(?:\.\d+)?)"},
+            ],
+            "fallback": None,
+            "fast_path": {
+                "anchor": ["div", "good-list-box"], "block": ["div", "p-r66"], "index": 1,
+                "element": {"tag": "p", "classes": ["font12", "color666", "m-t5"], "text": True,
+                            "value": r"(\d+(?:\.\d+)?)"},
+            },
+            "quotes": {
+                "row": {"css": "div.good-list-box > div", "xpath": "//div[@class~='good-list-box']/div"},
+                "price": {"css": "div.p-r66 p.font12.color666.m-t5",
+                          "xpath": ".//div[@class~='p-r66']//p[@class~='font12' and @class~='color666' and @class~='m-t5']",
+                          "text": "strip", "value": r"(\d+(?:\.\d+)?)"},
+                "stock": r"库存\D{0,4}(\d[\d,]*)",
+            },
+        },
+        "uu898": {
+            "url": "https://www.uu898.com/newTrade-1724-{item}-4745-{server}/",
+            "items": {"divine": "c1366", "exalted": "c1367", "chaos": "c1368", "chance": "c1376"},
+            "servers": {"default": "s73014"},
+            # 首条商品块的单价（元/个）；整页回退时避免命中“1元=…”结构
+            "selectors": [
+                {"css": "li.sp_li1 h6", "xpath": "(//li[@class~='sp_li1']//h6)[1]",
+                 "text": "strings", "value": r"(\d+(?:\.\d+)?)\s*元/个"},
+            ],
+            "fallback": r"(\d+(?:\.\d+)?)\s*元/个",
+            "fast_path": {
+                "anchor": None, "block": ["li", "sp_li1"], "index": 0,
+                "element": {"tag": "h6", "text": True, "value": r"(\d+(?:\.\d+)?)\s*元/个"},
+            },
+            "quotes": {
+                # 首条商品块及其同级商品
+                "row": {"css": "li.sp_li1, li.sp_li1 ~ li", "xpath": "(//li[@class~='sp_li1'])[1] | (//li[@class~='sp_li1'])[1]/following-sibling::li"},
+                "price": {"css": "h6", "xpath": ".//h6", "text": "strings", "value": r"(\d+(?:\.\d+)?)\s*元/个"},
+                "stock": r"库存\D{0,4}(\d[\d,]*)",
+            },
+        },
+        "7881": {
+            "url": "https://search.7881.com/G6186-{item}-{server}-0.html?pageNum=1",
+            "items": {"divine": "100001", "exalted": "100026", "chaos": "100087", "chance": "100110"},
+            "servers": {"default": "G6186P002-G6186P002001"},
+            # 第二条商品的单价：<div class="price-unit"><p><em>1</em>元=<em>1.587</em>个</p><p><em>0.6300</em>元/个</p></div>
+            "selectors": [
+                {"css": "div.list-box > div:nth-of-type(2) div.price-unit p:nth-of-type(2) em",
+                 "xpath": "(//div[@class~='list-box']/div[2]//div[@class~='price-unit']"
+                          "//p[count(preceding-sibling::p) = 1]//em)[1]",
+                 "text": "strip", "value": r"(\d+(?:\.\d+)?)"},
+                {"css": "div.price-unit p:nth-of-type(2) em",
+                 "xpath": "(//div[@class~='price-unit']//p[count(preceding-sibling::p) = 1]//em)[1]",
+                 "text": "strip", "value": r"(\d+(?:\.\d+)?)"},
+                {"css": "div.list-box div.price-unit p:nth-of-type(2) em",
+                 "xpath": "(//div[@class~='list-box']//div[@class~='price-unit']"
+                          "//p[count(preceding-sibling::p) = 1]//em)[1]",
+                 "text": "strip", "value": r"(\d+(?:\.\d+)?)"},
+            ],
+            "fallback": r"(\d+(?:\.\d+)?)\s*元/个",
+            "fast_path": {
+                "anchor": ["div", "list-box"], "block": ["div", "price-unit"], "index": 1,
+                # 第二个 <p> 须是“x 元/个”形式，避免块结构变化时误取块外的段落
+                "element": {"tag": "p", "nth": 1, "contains": "元/个", "text": False,
+                            "value": r"<em\b[^>]*>\s*(\d+(?:\.\d+)?)\s*</em>"},
+            },
+            "quotes": {
+                "row": {"css": "div.list-box > div", "xpath": "//div[@class~='list-box']/div"},
+                "price": {"css": "div.price-unit p:nth-of-type(2) em",
+                          "xpath": "(.//div[@class~='price-unit']//p[count(preceding-sibling::p) = 1]//em)[1]",
+                          "text": "strip", "value": r"(\d+(?:\.\d+)?)"},
+                "stock": r"库存\D{0,4}(\d[\d,]*)",
+            },
+        },
+    }
+    
+    # 价格抓取连接池配置（跨刷新周期复用 TCP+TLS 连接）
+    HTTP_POOL = {
+        "pool_connections": 8,   # 缓存的主机连接池数量
+        "pool_maxsize": 4,       # 每个主机的最大连接数
+        "idle_timeout": 90,      # 主机空闲超过该秒数后关闭其连接
+        "http2": False,          # 启用 HTTP/2（需安装 httpx[http2]），服务端未协商 h2 的主机自动回退到 HTTP/1.1
+    }
+    
     # 自动喝药相关配置
     AUTO_FLASK = {
         "ahk_path": "C:\\Program Files\\AutoHotkey\\AutoHotkey.exe",       # AHK程序路径
@@ -0,0 +1,101 @@
+"""
+HTTP 压缩协商
+按本机可用的解码库声明 Accept-Encoding（zstd / br 可用时优先，否则回退到 gzip），
+并统计每个请求的传输字节数（压缩后）与解码后字节数，用于评估按流量计费网络下的带宽节省
+"""
+
+import threading
+
+try:
+    from urllib3.util.request import ACCEPT_ENCODING as _URLLIB3_ENCODINGS
+except ImportError:
+    _URLLIB3_ENCODINGS = "gzip,deflate"
+
+try:
+    import brotli  # noqa: F401
+    _HAS_BROTLI = True
+except ImportError:
+    try:
+        import brotlicffi  # noqa: F401
+        _HAS_BROTLI = True
+    except ImportError:
+        _HAS_BROTLI = False
+
+try:
+    import zstandard  # noqa: F401
+    _HAS_ZSTD = True
+except ImportError:
+    _HAS_ZSTD = False
+
+
+def _supported():
+    # 只声明 urllib3 与 httpx 都能解码的编码：库已安装且 urllib3 自身也识别（版本过旧时不声明）
+    encodings = []
+    if _HAS_ZSTD and "zstd" in _URLLIB3_ENCODINGS:
+        encodings.append("zstd")
+    if _HAS_BROTLI and "br" in _URLLIB3_ENCODINGS:
+        encodings.append("br")
+    return encodings + ["gzip", "deflate"]
+
+
+SUPPORTED_ENCODINGS = tuple(_supported())
+ACCEPT_ENCODING = ", ".join(SUPPORTED_ENCODINGS)
+
+
+def accept_encoding():
+    """请求头 Accept-Encoding 的取值，例如 'zstd, br, gzip, deflate'"""
+    return ACCEPT_ENCODING
+
+
+def wire_bytes(resp):
+    """已从网络读取的字节数（解码前）；无法获取时返回 None
+
+    requests 响应通过 urllib3 的 raw.tell() 获取，httpx 响应通过 num_bytes_downloaded 获取。
+    """
+    n = getattr(resp, 'num_bytes_downloaded', None)
+    if n is not None:
+        return n
+    try:
+        return resp.raw.tell()
+    except Exception:
+        return None
+
+
+class TransferStats:
+    """按 Content-Encoding 累计请求数、传输字节与解码后字节（线程安全）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._totals = {}
+
+    def record(self, resp, decoded_bytes):
+        """记录一次响应，返回 (content_encoding, wire, decoded) 供调用方输出单请求日志"""
+        encoding = (resp.headers.get('Content-Encoding') or 'identity').strip().lower()
+        wire = wire_bytes(resp)
+        if wire is None:
+            wire = decoded_bytes
+        with self._lock:
+            entry = self._totals.setdefault(encoding, [0, 0, 0])
+            entry[0] += 1
+            entry[1] += wire
+            entry[2] += decoded_bytes
+        return encoding, wire, decoded_bytes
+
+    def format_stats(self):
+        with self._lock:
+            items = sorted(self._totals.items())
+        if not items:
+            return 'no requests'
+        parts = []
+        for encoding, (count, wire, decoded) in items:
+            saved = 1.0 - wire / decoded if decoded else 0.0
+            parts.append(f"{encoding}(n={count} wire={wire}B decoded={decoded}B saved={saved:.1%})")
+        return f"accept=[{ACCEPT_ENCODING}] " + ' '.join(parts)
+
+
+# 全局实例（价格抓取、帖子监控、公告、更新检查共用）
+_transfer_stats = TransferStats()
+
+
+def get_transfer_stats():
+    return _transfer_stats
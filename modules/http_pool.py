@@ -0,0 +1,275 @@
+"""
+HTTP 连接池模块
+为价格抓取提供跨 PriceScraper 线程、跨刷新周期共享的长连接池
+可选 HTTP/2 传输：同一主机的多个货币页面复用一条连接并发传输，服务端不支持时回退到 HTTP/1.1 连接池
+"""
+
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from modules.charset_resolver import get_charset_resolver
+from modules.config import Config
+
+try:
+    import httpx
+    import h2  # noqa: F401  httpx 的 HTTP/2 支持依赖 h2
+except ImportError:
+    httpx = None
+
+
+def http2_available():
+    return httpx is not None
+
+
+class _CountingAdapter(HTTPAdapter):
+    """统计新建连接数/请求数的适配器
+
+    urllib3 的每个主机连接池自带 num_connections（新建连接数）与 num_requests（请求数）计数，
+    连接池被淘汰时先把计数累加到 retired 中，避免统计丢失。
+    """
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self._retired_connections = 0
+        self._retired_requests = 0
+        self.poolmanager.pools.dispose_func = self._retire_pool
+
+    def _retire_pool(self, pool):
+        self._retired_connections += getattr(pool, 'num_connections', 0)
+        self._retired_requests += getattr(pool, 'num_requests', 0)
+        pool.close()
+
+    def iter_pools(self):
+        pools = self.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is not None:
+                yield key, pool
+
+    def drop_host(self, host):
+        """关闭并移除指定主机的连接池，返回关闭的连接池数量"""
+        dropped = 0
+        for key, _pool in self.iter_pools():
+            if getattr(key, 'key_host', None) == host:
+                try:
+                    del self.poolmanager.pools[key]  # 触发 _retire_pool
+                    dropped += 1
+                except KeyError:
+                    pass
+        return dropped
+
+    def connection_counts(self):
+        connections = self._retired_connections
+        reqs = self._retired_requests
+        for _key, pool in self.iter_pools():
+            connections += getattr(pool, 'num_connections', 0)
+            reqs += getattr(pool, 'num_requests', 0)
+        return connections, reqs
+
+
+class _HttpxResponse:
+    """把 httpx.Response 包装成调用方使用的 requests.Response 接口（status_code/headers/content/text）"""
+
+    def __init__(self, resp):
+        self._resp = resp
+        self.status_code = resp.status_code
+        self.headers = resp.headers
+        self.url = str(resp.url)
+        self.http_version = resp.http_version
+        self.encoding = resp.charset_encoding
+
+    @property
+    def content(self):
+        return self._resp.read()
+
+    @property
+    def num_bytes_downloaded(self):
+        return self._resp.num_bytes_downloaded
+
+    def iter_content(self, chunk_size=None):
+        return self._resp.iter_bytes(chunk_size)
+
+    def close(self):
+        self._resp.close()
+
+    @property
+    def text(self):
+        return get_charset_resolver().decode(self.url, self.headers.get('Content-Type'), self.content)
+
+
+class HttpPool:
+    """线程安全的按主机长连接池
+
+    - 所有抓取线程共享同一个 requests.Session，同一主机的请求复用已建立的 TCP+TLS 连接
+    - 主机空闲超过 idle_timeout 秒后主动关闭其连接，避免复用已被服务端断开的连接
+    - 统计新建连接数与复用次数，便于在 --debug-price 下观察握手节省
+    - http2=True 且已安装 httpx[http2] 时优先走 HTTP/2；某主机未协商出 h2 则该主机此后改走 HTTP/1.1 连接池
+    """
+
+    def __init__(self, pool_connections=8, pool_maxsize=4, idle_timeout=90, http2=False):
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.idle_timeout = idle_timeout
+        self._lock = threading.Lock()
+        self._last_used = {}
+        self._evicted = 0
+        self._h1_hosts = set()
+        self._h2_requests = 0
+        self._h2_client = None
+        if http2 and http2_available():
+            self._h2_client = httpx.Client(
+                http2=True,
+                follow_redirects=True,
+                limits=httpx.Limits(max_keepalive_connections=pool_connections,
+                                    keepalive_expiry=idle_timeout or None),
+            )
+        self._adapter = _CountingAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=False,
+        )
+        self._session = requests.Session()
+        self._session.mount('https://', self._adapter)
+        self._session.mount('http://', self._adapter)
+
+    def get(self, url, headers=None, timeout=8, stream=False, **kwargs):
+        """通过共享连接池发起 GET 请求，参数与 requests.get 一致
+
+        stream=True 时响应体按需读取（iter_content），调用方读完或 close() 后连接才会归还连接池。
+        """
+        host = urlsplit(url).hostname or ''
+        self.evict_idle()
+        with self._lock:
+            self._last_used[host] = time.monotonic()
+            use_h2 = self._h2_client is not None and host not in self._h1_hosts and not kwargs
+        if use_h2:
+            return self._get_h2(host, url, headers, timeout, stream)
+        return self._session.get(url, headers=headers, timeout=timeout, stream=stream, **kwargs)
+
+    def _get_h2(self, host, url, headers, timeout, stream=False):
+        request = self._h2_client.build_request('GET', url, headers=headers, timeout=timeout)
+        resp = _HttpxResponse(self._h2_client.send(request, stream=stream))
+        with self._lock:
+            if resp.http_version == 'HTTP/2':
+                self._h2_requests += 1
+            else:
+                # 服务端未协商 h2：该主机后续请求回退到 HTTP/1.1 连接池
+                self._h1_hosts.add(host)
+        return resp
+
+    def evict_idle(self):
+        """关闭空闲超时的主机连接"""
+        if not self.idle_timeout or self.idle_timeout <= 0:
+            return
+        now = time.monotonic()
+        with self._lock:
+            idle_hosts = [h for h, ts in self._last_used.items() if now - ts > self.idle_timeout]
+            for host in idle_hosts:
+                self._last_used.pop(host, None)
+                self._evicted += self._adapter.drop_host(host)
+
+    def stats(self):
+        """返回连接统计：HTTP/1.1 新建连接数、复用次数、请求总数、已淘汰连接池数、活跃主机数、HTTP/2 请求数"""
+        with self._lock:
+            connections, reqs = self._adapter.connection_counts()
+            return {
+                "new": connections,
+                "reused": max(0, reqs - connections),
+                "requests": reqs,
+                "evicted": self._evicted,
+                "hosts": len(self._last_used),
+                "h2_requests": self._h2_requests,
+                "h1_fallback_hosts": len(self._h1_hosts),
+            }
+
+    def format_stats(self):
+        s = self.stats()
+        text = (f"requests={s['requests']} new_conn={s['new']} reused={s['reused']} "
+                f"evicted={s['evicted']} hosts={s['hosts']}")
+        if self._h2_client is not None:
+            text += f" h2_requests={s['h2_requests']} h1_fallback_hosts={s['h1_fallback_hosts']}"
+        return text
+
+    def close(self):
+        with self._lock:
+            self._last_used.clear()
+            try:
+                self._session.close()
+                if self._h2_client is not None:
+                    self._h2_client.close()
+            except Exception:
+                pass
+
+
+class HostLimiter:
+    """按主机限制同时进行的请求数（线程安全），并统计因限流而等待的次数与时长"""
+
+    def __init__(self, limit=2):
+        self.limit = max(1, int(limit))
+        self._lock = threading.Lock()
+        self._slots = {}
+        self._waits = 0
+        self._waited = 0.0
+
+    def _semaphore(self, url):
+        host = urlsplit(url).hostname or ''
+        with self._lock:
+            sem = self._slots.get(host)
+            if sem is None:
+                sem = self._slots[host] = threading.BoundedSemaphore(self.limit)
+            return sem
+
+    def acquire(self, url, timeout=None):
+        """占用该主机的一个请求名额；超时返回 None，否则返回需传给 release() 的句柄"""
+        sem = self._semaphore(url)
+        if sem.acquire(blocking=False):
+            return sem
+        started = time.monotonic()
+        acquired = sem.acquire(timeout=timeout) if timeout is not None else sem.acquire()
+        with self._lock:
+            self._waits += 1
+            self._waited += time.monotonic() - started
+        return sem if acquired else None
+
+    @staticmethod
+    def release(handle):
+        if handle is not None:
+            handle.release()
+
+    def format_stats(self):
+        with self._lock:
+            return f"limit={self.limit} hosts={len(self._slots)} waits={self._waits} waited={self._waited:.2f}s"
+
+
+# 全局实例（跨 PriceScraper 线程共享）
+_http_pool = None
+_http_pool_lock = threading.Lock()
+
+
+def get_http_pool():
+    """获取全局连接池实例（首次调用时按 Config.HTTP_POOL 创建）"""
+    global _http_pool
+    if _http_pool is None:
+        with _http_pool_lock:
+            if _http_pool is None:
+                cfg = Config.HTTP_POOL
+                _http_pool = HttpPool(
+                    pool_connections=cfg.get("pool_connections", 8),
+                    pool_maxsize=cfg.get("pool_maxsize", 4),
+                    idle_timeout=cfg.get("idle_timeout", 90),
+                    http2=cfg.get("http2", False),
+                )
+    return _http_pool
+
+
+def close_http_pool():
+    """关闭全局连接池（程序退出时调用）"""
+    global _http_pool
+    with _http_pool_lock:
+        if _http_pool is not None:
+            _http_pool.close()
+            _http_pool = None
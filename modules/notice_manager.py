@@ -12,6 +12,7 @@ from PyQt5.QtWidgets import QDialog, QVBoxLayout, QLabel, QPushButton, QTextBrow
 from PyQt5.QtGui import QColor
 
 from modules.config import Config
+from modules.http_compression import accept_encoding, get_transfer_stats
 
 try:
     import requests
@@ -167,9 +168,11 @@ class NoticeManager(QObject):
                         self.failed.emit("缺少requests库")
                         return
                     headers = {
-                        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+                        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+                        'Accept-Encoding': accept_encoding()
                     }
                     resp = requests.get(self.url, headers=headers, timeout=5)
+                    get_transfer_stats().record(resp, len(resp.content))
                     if resp.status_code == 200 and resp.text.strip():
                         self.fetched.emit(resp.text)
                     else:
@@ -0,0 +1,230 @@
+"""
+异步价格抓取引擎
+在单个事件循环线程内并发抓取所有 区服×货币×来源 页面，按主机限制并发数，同一轮内相同 URL 只下载一次
+"""
+
+import asyncio
+import time
+from urllib.parse import urlsplit
+
+from modules.charset_resolver import get_charset_resolver
+from modules.http_compression import get_transfer_stats
+from modules.price_retry import get_retry_policy, classify_error, RETRY_CONNECT
+from modules.price_health import OUTCOME_OK, OUTCOME_EMPTY, OUTCOME_CHALLENGED, OUTCOME_ERROR
+from modules.price_sources import is_challenge_page, is_challenge_head, get_challenge_stats
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+
+def is_available():
+    """异步后端依赖 httpx，未安装时调用方应回退到线程池后端"""
+    return httpx is not None
+
+
+def _decode(resp, raw):
+    """按响应头 / BOM / <meta charset> / 主机缓存解析字符集后解码（与线程后端一致）"""
+    return get_charset_resolver().decode(str(resp.url), resp.headers.get('Content-Type'), raw)
+
+
+class AsyncPriceEngine:
+    """单事件循环价格抓取引擎
+
+    - 所有 区服×货币（调用方给出的键，原样回传）并发进行，每格内部仍按来源优先级依次尝试，成功即停止
+    - 每个主机一个信号量，限制同一站点的并发请求数；多个格子请求同一 URL 时只下载、解析一次
+    - 解析逻辑由调用方传入（与线程后端共用），引擎本身只负责网络 I/O 与调度
+    - 响应体边下载边检查开头的挑战页特征，命中即中止下载，不解析、不重试，直接尝试下一来源
+    """
+
+    def __init__(self, build_headers, parse_price, per_host_limit=2, timeout=8, stagger_ms=50, log=None,
+                 validator_cache=None, http2=False, health=None, breaker=None, deadline=None,
+                 challenge_sniff_bytes=8192):
+        self.build_headers = build_headers
+        self.parse_price = parse_price
+        self.validator_cache = validator_cache
+        self.http2 = http2
+        self.health = health
+        self.breaker = breaker
+        self.deadline = deadline  # time.monotonic() 时间点；到达后不再发起新请求，已完成的货币照常回调
+        self.per_host_limit = max(1, int(per_host_limit))
+        self.timeout = timeout
+        self.stagger_ms = stagger_ms
+        self.challenge_sniff_bytes = challenge_sniff_bytes
+        self._log = log or (lambda msg: None)
+        self._host_limits = {}
+        self._flights = {}
+
+    def _remaining(self):
+        return None if self.deadline is None else self.deadline - time.monotonic()
+
+    def _request_timeout(self):
+        remaining = self._remaining()
+        return self.timeout if remaining is None else min(self.timeout, remaining)
+
+    def _host_semaphore(self, url):
+        host = urlsplit(url).hostname or ''
+        sem = self._host_limits.get(host)
+        if sem is None:
+            sem = asyncio.Semaphore(self.per_host_limit)
+            self._host_limits[host] = sem
+        return sem
+
+    async def _read_body(self, resp, site):
+        """读取响应体，返回 (raw, challenged)；开头命中挑战页特征时立即停止读取"""
+        raw = bytearray()
+        async for chunk in resp.aiter_bytes():
+            sniffing = len(raw) < self.challenge_sniff_bytes
+            raw += chunk
+            if sniffing and is_challenge_head(raw, site, resp.charset_encoding, self.challenge_sniff_bytes):
+                return bytes(raw), True
+        return bytes(raw), False
+
+    async def _fetch_html(self, client, site, url, extra_headers=None):
+        """返回 (resp, html, challenged)；304 时 html 为空串"""
+        headers = self.build_headers(url)
+        if extra_headers:
+            headers.update(extra_headers)
+        async with self._host_semaphore(url):
+            async with client.stream('GET', url, headers=headers, timeout=max(0.01, self._request_timeout())) as resp:
+                if resp.status_code == 304:
+                    self._log(f"GET {url} status=304 not modified (async)")
+                    return resp, "", False
+                raw, challenged = await self._read_body(resp, site)
+        html = _decode(resp, raw)
+        ce, wire, decoded = get_transfer_stats().record(resp, len(raw))
+        self._log(f"GET {url} status={resp.status_code} len={len(html)} http={resp.http_version} "
+                  f"wire={wire}B decoded={decoded}B ce={ce} challenged={challenged} (async)")
+        return resp, html, challenged
+
+    async def _fetch_with_retry(self, client, site, url, extra_headers=None):
+        """与线程后端相同的重试策略，退避期间不占用事件循环"""
+        policy = get_retry_policy(site)
+        attempt = 0
+        while True:
+            attempt += 1
+            error = None
+            try:
+                resp, html, challenged = await self._fetch_html(client, site, url, extra_headers)
+                # 挑战页重试也只会再次得到挑战页，直接换下一来源
+                reason = None if challenged else policy.retry_reason(attempt, status=resp.status_code)
+            except Exception as e:
+                error = e
+                reason = policy.retry_reason(attempt, exc=e)
+            if not reason:
+                if error is not None:
+                    raise error
+                return resp, html, challenged
+            delay = policy.backoff(attempt)
+            if not policy.fits_budget(delay, self._remaining()):
+                self._log(f"{site} {reason}: no budget left for retry")
+                if error is not None:
+                    raise error
+                return resp, html, challenged
+            self._log(f"{site} {reason}; retry {attempt + 1}/{policy.max_attempts} in {delay:.2f}s")
+            await asyncio.sleep(delay)
+
+    async def _get_site_price(self, client, site, url, key=None):
+        """同一轮内相同 URL 的请求共用一次下载与解析，返回 (price, outcome)"""
+        flight = self._flights.get(url)
+        if flight is not None:
+            price, _outcome = await asyncio.shield(flight)
+            self._log(f"{site} dedup {key}: reuse price={price} (async)")
+            return price, None  # 结果已由首个请求计入健康度
+        flight = self._flights[url] = asyncio.get_running_loop().create_future()
+        result = (0.0, OUTCOME_ERROR)
+        try:
+            result = await self._fetch_site_price(client, site, url, key)
+            return result
+        finally:
+            flight.set_result(result)
+
+    async def _fetch_site_price(self, client, site, url, key=None):
+        cache = self.validator_cache
+        conditional = cache.conditional_headers(url) if cache else None
+        resp, html, challenged = await self._fetch_with_retry(client, site, url, conditional)
+        if resp.status_code == 304 and conditional:
+            cache.touch(url)
+            price = cache.cached_price(url)
+            self._log(f"{site} not modified; reuse price={price}")
+            return price, OUTCOME_OK
+        if challenged:
+            read = resp.num_bytes_downloaded
+            get_challenge_stats().record(site, True, read)
+            self._log(f"{site} challenge page detected after {read}B; download aborted (async)")
+            return 0.0, OUTCOME_CHALLENGED
+        # 解析为 CPU 操作，放到默认线程池中执行，避免阻塞事件循环上的其他请求
+        price = await asyncio.get_running_loop().run_in_executor(None, self.parse_price, site, html, key)
+        if cache and price > 0 and resp.status_code == 200:
+            cache.store(url, resp.headers.get('ETag'), resp.headers.get('Last-Modified'), price)
+        if price > 0:
+            return price, OUTCOME_OK
+        if is_challenge_page(html, site):
+            get_challenge_stats().record(site, False, resp.num_bytes_downloaded)
+            self._log(f"{site} challenge page detected (async)")
+            return price, OUTCOME_CHALLENGED
+        return price, OUTCOME_EMPTY
+
+    async def _get_key_price(self, client, key, sources, delay_ms):
+        if delay_ms > 0:
+            await asyncio.sleep(delay_ms / 1000.0)
+        for site, url in sources:
+            if self._request_timeout() <= 0:
+                break
+            if self.breaker is not None and not self.breaker.allow(site):
+                self._log(f"{site} skipped: circuit {self.breaker.state(site)}")
+                continue
+            started = time.monotonic()
+            connect_error = False
+            outcome = None
+            try:
+                price, outcome = await self._get_site_price(client, site, url, key)
+            except Exception as e:
+                self._log(f"{site} exception: {e}")
+                price, outcome = 0.0, OUTCOME_ERROR
+                connect_error = classify_error(e) == RETRY_CONNECT
+            finally:
+                # 到达截止时间被取消（CancelledError）或复用了其他请求的结果时没有结果可记，只放弃探测机会
+                if outcome is not None:
+                    if self.health is not None:
+                        self.health.record(site, outcome, time.monotonic() - started)
+                    if self.breaker is not None:
+                        self.breaker.record(site, outcome == OUTCOME_OK, connect_error)
+                elif self.breaker is not None:
+                    self.breaker.release(site)
+            self._log(f"try {key}@{site} => {price}")
+            if price > 0:
+                return key, site, price
+        return key, None, 0.0
+
+    async def _run(self, source_matrix, on_price):
+        self._host_limits = {}
+        self._flights = {}
+        limits = httpx.Limits(max_connections=self.per_host_limit * 4,
+                              max_keepalive_connections=self.per_host_limit * 4)
+        async with httpx.AsyncClient(timeout=self.timeout, limits=limits, follow_redirects=True,
+                                     http2=self.http2) as client:
+            tasks = [
+                asyncio.create_task(self._get_key_price(client, key, sources, i * self.stagger_ms))
+                for i, (key, sources) in enumerate(source_matrix.items())
+            ]
+            try:
+                for done in asyncio.as_completed(tasks, timeout=self._remaining()):
+                    try:
+                        key, site, price = await done
+                    except asyncio.TimeoutError:
+                        raise
+                    except Exception:
+                        continue
+                    if price > 0:
+                        on_price(key, price, site)
+            except asyncio.TimeoutError:
+                self._log("refresh deadline reached; delivering partial results (async)")
+                for task in tasks:
+                    task.cancel()
+
+    def run(self, source_matrix, on_price):
+        """阻塞运行一次完整刷新；source_matrix 为 {键: [(site, url), ...]}，on_price(键, price, site) 在事件循环线程中回调"""
+        asyncio.run(self._run(source_matrix, on_price))
+
@@ -0,0 +1,113 @@
+"""
+价格页面条件请求缓存
+按 URL 保存 ETag / Last-Modified 与上次解析出的价格，命中 304 时直接复用价格，无需重新下载和解析
+"""
+
+import json
+import os
+import threading
+import time
+
+from modules.config import Config
+
+
+class ValidatorCache:
+    """URL -> {etag, last_modified, price, ts} 的小型磁盘缓存（线程安全）"""
+
+    def __init__(self, path, max_age=86400):
+        self.path = path
+        self.max_age = max_age  # 超过该秒数的缓存不再用于条件请求，强制完整下载一次
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._dirty = False
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if isinstance(data, dict):
+                self._entries = {k: v for k, v in data.items() if isinstance(v, dict)}
+        except (OSError, ValueError):
+            self._entries = {}
+
+    def save(self):
+        """有改动时写回磁盘（先写临时文件再替换，避免写一半被打断）"""
+        with self._lock:
+            if not self._dirty:
+                return
+            snapshot = dict(self._entries)
+            self._dirty = False
+        tmp_path = self.path + '.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            with self._lock:
+                self._dirty = True
+
+    def _fresh_entry(self, url):
+        entry = self._entries.get(url)
+        if not entry or float(entry.get('price') or 0.0) <= 0:
+            return None
+        if self.max_age and time.time() - float(entry.get('ts') or 0) > self.max_age:
+            return None
+        return entry
+
+    def conditional_headers(self, url):
+        """返回应附加到请求上的 If-None-Match / If-Modified-Since 头；无可用缓存时返回空字典"""
+        with self._lock:
+            entry = self._fresh_entry(url)
+            if not entry:
+                return {}
+            headers = {}
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+            return headers
+
+    def cached_price(self, url):
+        """304 时复用的价格；无缓存返回0.0"""
+        with self._lock:
+            entry = self._entries.get(url)
+            return float(entry.get('price') or 0.0) if entry else 0.0
+
+    def store(self, url, etag, last_modified, price):
+        """记录一次成功解析的结果；服务端未提供任何校验值时不缓存"""
+        if not etag and not last_modified:
+            return
+        with self._lock:
+            self._entries[url] = {
+                'etag': etag or '',
+                'last_modified': last_modified or '',
+                'price': float(price),
+                'ts': time.time(),
+            }
+            self._dirty = True
+
+    def touch(self, url):
+        """304 命中后刷新时间戳，使缓存在 max_age 内持续有效"""
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry:
+                entry['ts'] = time.time()
+                self._dirty = True
+
+
+# 全局实例
+_validator_cache = None
+_validator_cache_lock = threading.Lock()
+
+
+def get_validator_cache():
+    """获取全局条件请求缓存（存放于应用数据目录）"""
+    global _validator_cache
+    if _validator_cache is None:
+        with _validator_cache_lock:
+            if _validator_cache is None:
+                path = os.path.join(Config.get_app_data_dir(), 'price_validators.json')
+                _validator_cache = ValidatorCache(
+                    path, max_age=Config.PRICE_SCRAPER.get("validator_max_age", 86400))
+    return _validator_cache
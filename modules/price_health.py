@@ -0,0 +1,286 @@
+"""
+价格来源健康度统计
+按站点记录最近若干次抓取的结果与耗时（成功率、p50/p95 延迟、挑战页比例），持久化到应用数据目录，
+并据此为每种货币动态决定来源的尝试顺序；另提供按站点的熔断器，站点持续返回挑战页或失败时暂停请求
+"""
+
+import json
+import os
+import random
+import threading
+import time
+from collections import deque
+
+from modules.config import Config
+
+
+# 单次抓取结果分类
+OUTCOME_OK = "ok"                  # 解析出有效价格（含 304 复用）
+OUTCOME_EMPTY = "empty"            # 页面正常但未解析出价格
+OUTCOME_CHALLENGED = "challenged"  # 命中反爬挑战页
+OUTCOME_ERROR = "error"            # 网络错误/超时/异常
+OUTCOMES = (OUTCOME_OK, OUTCOME_EMPTY, OUTCOME_CHALLENGED, OUTCOME_ERROR)
+
+
+def _percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    idx = min(len(sorted_values) - 1, max(0, int(round(q * (len(sorted_values) - 1)))))
+    return sorted_values[idx]
+
+
+class SourceHealthTracker:
+    """按站点保存最近 window 次抓取样本 (outcome, latency)，线程安全"""
+
+    def __init__(self, path=None, window=50, priority_bias=0.15, default_latency=2.0, explore_ratio=0.1):
+        self.path = path
+        self.window = window
+        self.priority_bias = priority_bias      # 静态优先级的轻微加权，分数接近时保持原顺序
+        self.explore_ratio = explore_ratio      # 按该概率保持静态顺序，让被降级的来源有机会重新采样
+        self.default_latency = default_latency  # 无样本时假定的延迟（秒）
+        self._lock = threading.Lock()
+        self._samples = {}
+        self._dirty = False
+        if path:
+            self.load()
+
+    def load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if not isinstance(data, dict):
+            return
+        for site, samples in data.items():
+            dq = deque(maxlen=self.window)
+            for item in samples if isinstance(samples, list) else []:
+                try:
+                    outcome, latency = item[0], float(item[1])
+                except (TypeError, ValueError, IndexError):
+                    continue
+                if outcome in OUTCOMES:
+                    dq.append((outcome, latency))
+            self._samples[site] = dq
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            snapshot = {site: [list(s) for s in dq] for site, dq in self._samples.items()}
+            self._dirty = False
+        tmp_path = self.path + '.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            with self._lock:
+                self._dirty = True
+
+    def record(self, site, outcome, latency):
+        with self._lock:
+            dq = self._samples.get(site)
+            if dq is None:
+                dq = self._samples[site] = deque(maxlen=self.window)
+            dq.append((outcome, round(float(latency), 3)))
+            self._dirty = True
+
+    def stats(self, site):
+        """返回 {samples, success_ratio, challenge_rate, p50, p95}；无样本时比例与延迟为 None"""
+        with self._lock:
+            samples = list(self._samples.get(site, ()))
+        n = len(samples)
+        if not n:
+            return {"samples": 0, "success_ratio": None, "challenge_rate": None, "p50": None, "p95": None}
+        ok = sum(1 for o, _ in samples if o == OUTCOME_OK)
+        challenged = sum(1 for o, _ in samples if o == OUTCOME_CHALLENGED)
+        latencies = sorted(lat for _, lat in samples)
+        return {
+            "samples": n,
+            "success_ratio": ok / n,
+            "challenge_rate": challenged / n,
+            "p50": _percentile(latencies, 0.50),
+            "p95": _percentile(latencies, 0.95),
+        }
+
+    def score(self, site):
+        """预期拿到有效价格的耗时（越小越好）：p50 延迟 / 平滑后的成功率"""
+        s = self.stats(site)
+        # 拉普拉斯平滑：样本少时成功率向 0.5 收敛，避免一次失败就被排到最后
+        ok = (s["success_ratio"] or 0.0) * s["samples"]
+        success = (ok + 1.0) / (s["samples"] + 2.0)
+        latency = s["p50"] if s["p50"] is not None else self.default_latency
+        return max(latency, 0.05) / success
+
+    def order(self, sources):
+        """按健康度重排 [(site, url), ...]；静态优先级靠前的来源获得轻微加权"""
+        if self.explore_ratio and random.random() < self.explore_ratio:
+            return list(sources)
+        keyed = []
+        for idx, (site, url) in enumerate(sources):
+            keyed.append((self.score(site) * (1.0 + self.priority_bias * idx), idx, site, url))
+        keyed.sort()
+        return [(site, url) for _, _, site, url in keyed]
+
+    def format_stats(self):
+        parts = []
+        with self._lock:
+            sites = list(self._samples)
+        for site in sites:
+            s = self.stats(site)
+            if not s["samples"]:
+                continue
+            parts.append(f"{site}(n={s['samples']} ok={s['success_ratio']:.0%} "
+                         f"challenge={s['challenge_rate']:.0%} p50={s['p50']:.2f}s p95={s['p95']:.2f}s)")
+        return ' '.join(parts) or 'no samples'
+
+
+# 全局实例
+_source_health = None
+_source_health_lock = threading.Lock()
+
+
+def get_source_health():
+    """获取全局来源健康度统计（存放于应用数据目录）"""
+    global _source_health
+    if _source_health is None:
+        with _source_health_lock:
+            if _source_health is None:
+                cfg = Config.PRICE_SCRAPER
+                _source_health = SourceHealthTracker(
+                    os.path.join(Config.get_app_data_dir(), 'source_health.json'),
+                    window=cfg.get("health_window", 50),
+                    priority_bias=cfg.get("health_priority_bias", 0.15),
+                    explore_ratio=cfg.get("health_explore_ratio", 0.1),
+                )
+    return _source_health
+
+
+# 熔断器状态
+BREAKER_CLOSED = "closed"        # 正常放行
+BREAKER_OPEN = "open"            # 熔断中，直接跳过该站点
+BREAKER_HALF_OPEN = "half_open"  # 冷却结束，只放行一个探测请求
+
+# 站点在一轮刷新中的结果（熔断器按轮计数）
+_ROUND_OK = "ok"            # 本轮至少成功一次
+_ROUND_FAILED = "failed"    # 本轮失败（零价格、挑战页、超时等）
+_ROUND_CONNECT = "connect"  # 本轮只出现建连失败
+
+
+class SiteCircuitBreaker:
+    """按站点的熔断器
+
+    失败按刷新轮计数：record() 把失败记在本轮，每轮结束时调用 end_round()，本轮失败且未成功过的站点各计一次失败
+    （一轮内同一站点有多个货币请求，只计一次）；本轮所有站点都只是建连失败时视为本机断网，不计数。
+    连续 threshold 轮失败后熔断，冷却 cooldown 秒后进入半开状态，仅放行一个探测请求：
+    探测成功则恢复，失败则重新熔断且冷却时间翻倍（不超过 max_cooldown）。
+    """
+
+    def __init__(self, threshold=3, cooldown=90, max_cooldown=7200, clock=None):
+        self.threshold = max(1, int(threshold))
+        self.cooldown = cooldown
+        self.max_cooldown = max(cooldown, max_cooldown)
+        self._clock = clock or time.monotonic
+        self._lock = threading.Lock()
+        self._sites = {}
+        self._round = {}  # 站点 -> 本轮结果（_ROUND_*）
+
+    def _entry(self, site):
+        entry = self._sites.get(site)
+        if entry is None:
+            entry = self._sites[site] = {
+                "state": BREAKER_CLOSED, "failures": 0, "opened_at": 0.0,
+                "cooldown": self.cooldown, "probing": False, "trips": 0,
+            }
+        return entry
+
+    def allow(self, site):
+        """是否放行对该站点的请求；半开状态下只有第一个调用者获得探测机会"""
+        with self._lock:
+            entry = self._entry(site)
+            if entry["state"] == BREAKER_CLOSED:
+                return True
+            if entry["state"] == BREAKER_OPEN:
+                if self._clock() - entry["opened_at"] < entry["cooldown"]:
+                    return False
+                entry["state"] = BREAKER_HALF_OPEN
+                entry["probing"] = False
+            if entry["probing"]:
+                return False
+            entry["probing"] = True
+            return True
+
+    def record(self, site, success, connect_error=False):
+        """记录一次请求结果：成功立即恢复；失败只记在本轮（connect_error 表示建连失败），由 end_round() 计数"""
+        with self._lock:
+            entry = self._entry(site)
+            if success:
+                entry.update(state=BREAKER_CLOSED, failures=0, probing=False, cooldown=self.cooldown)
+                self._round[site] = _ROUND_OK
+            elif self._round.get(site) in (None, _ROUND_CONNECT):
+                self._round[site] = _ROUND_CONNECT if connect_error else _ROUND_FAILED
+
+    def end_round(self):
+        """一轮刷新结束：本轮失败的站点各计一次失败；所有站点都只是建连失败时不计数，返回是否判定为本机断网"""
+        with self._lock:
+            outcomes, self._round = self._round, {}
+            offline = bool(outcomes) and all(o == _ROUND_CONNECT for o in outcomes.values())
+            for site, outcome in outcomes.items():
+                if outcome == _ROUND_OK:
+                    continue
+                entry = self._entry(site)
+                if offline:
+                    entry["probing"] = False  # 半开探测未能连上，下一轮重新探测
+                    continue
+                entry["failures"] += 1
+                if entry["state"] == BREAKER_HALF_OPEN:
+                    entry["cooldown"] = min(self.max_cooldown, entry["cooldown"] * 2)
+                    self._trip(entry)
+                elif entry["state"] == BREAKER_CLOSED and entry["failures"] >= self.threshold:
+                    self._trip(entry)
+            return offline
+
+    def _trip(self, entry):
+        entry.update(state=BREAKER_OPEN, opened_at=self._clock(), probing=False)
+        entry["trips"] += 1
+
+    def release(self, site):
+        """放弃本次探测（请求被取消、未产生结果），让下一个调用者重新获得探测机会"""
+        with self._lock:
+            self._entry(site)["probing"] = False
+
+    def state(self, site):
+        with self._lock:
+            return self._entry(site)["state"]
+
+    def format_stats(self):
+        parts = []
+        with self._lock:
+            for site, entry in self._sites.items():
+                text = f"{site}={entry['state']}(fails={entry['failures']} trips={entry['trips']}"
+                if entry["state"] == BREAKER_OPEN:
+                    left = max(0.0, entry["cooldown"] - (self._clock() - entry["opened_at"]))
+                    text += f" retry_in={left:.0f}s"
+                parts.append(text + ")")
+        return ' '.join(parts) or 'no sites'
+
+
+_circuit_breaker = None
+
+
+def get_circuit_breaker():
+    """获取全局站点熔断器（仅保存在内存中，程序重启后重置）"""
+    global _circuit_breaker
+    if _circuit_breaker is None:
+        with _source_health_lock:
+            if _circuit_breaker is None:
+                cfg = Config.PRICE_SCRAPER
+                _circuit_breaker = SiteCircuitBreaker(
+                    threshold=cfg.get("breaker_threshold", 3),
+                    cooldown=cfg.get("breaker_cooldown", 90),
+                    max_cooldown=cfg.get("breaker_max_cooldown", 7200),
+                )
+    return _circuit_breaker
@@ -0,0 +1,492 @@
+"""
+价格历史存储
+每个被采纳的价格以 (ts, server, currency, source, price) 写入应用数据目录下的 SQLite 数据库。
+写入只是入队，由后台写线程攒批后在 WAL 模式下一次事务提交，抓取线程与界面线程都不会等待磁盘；
+(currency, ts) 索引支撑按货币的时间范围查询。
+
+分层保留：写线程空闲时分小块把已结束的小时汇总为小时 OHLC（开、高、低、收、条数），再把小时汇总为日 OHLC，
+并删除超出保留期且已汇总的原始价格与小时汇总。query_series() 按请求的分辨率读取满足要求的最粗一层，
+细层已被清理的较早时段由更粗一层补齐。
+"""
+
+import functools
+import math
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+from modules.config import Config
+from modules.price_registry import DEFAULT_SERVER
+
+
+TIER_RAW = 0
+TIER_HOUR = 3600
+TIER_DAY = 86400
+TIERS = (TIER_RAW, TIER_HOUR, TIER_DAY)
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS price_ticks ("
+    " ts REAL NOT NULL,"
+    " server TEXT NOT NULL,"
+    " currency TEXT NOT NULL,"
+    " source TEXT NOT NULL,"
+    " price REAL NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS idx_price_ticks_currency_ts ON price_ticks (currency, ts)",
+    "CREATE INDEX IF NOT EXISTS idx_price_ticks_ts ON price_ticks (ts)",  # 汇总与清理按时间分块
+    "CREATE TABLE IF NOT EXISTS price_rollups ("
+    " tier INTEGER NOT NULL,"
+    " currency TEXT NOT NULL,"
+    " server TEXT NOT NULL,"
+    " bucket REAL NOT NULL,"
+    " open REAL NOT NULL,"
+    " high REAL NOT NULL,"
+    " low REAL NOT NULL,"
+    " close REAL NOT NULL,"
+    " count INTEGER NOT NULL,"
+    " PRIMARY KEY (tier, currency, server, bucket))",
+    # 每层的进度：rolled 之前的下一层数据已汇总进本层；purged 之前的本层数据已被清理
+    "CREATE TABLE IF NOT EXISTS rollup_state ("
+    " tier INTEGER PRIMARY KEY,"
+    " rolled REAL NOT NULL DEFAULT 0,"
+    " purged REAL NOT NULL DEFAULT 0)",
+)
+
+_UPSERT_ROLLUP = (
+    "INSERT INTO price_rollups (tier, currency, server, bucket, open, high, low, close, count)"
+    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+    " ON CONFLICT (tier, currency, server, bucket) DO UPDATE SET"
+    " high = max(high, excluded.high), low = min(low, excluded.low),"
+    " close = excluded.close, count = count + excluded.count"
+)
+
+# 补录进已有汇总区间：无法判断与区间内已有价格的先后，只更新最高、最低与条数
+_MERGE_ROLLUP = (
+    "INSERT INTO price_rollups (tier, currency, server, bucket, open, high, low, close, count)"
+    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+    " ON CONFLICT (tier, currency, server, bucket) DO UPDATE SET"
+    " high = max(high, excluded.high), low = min(low, excluded.low), count = count + excluded.count"
+)
+
+_COMPACT_SPAN = {TIER_HOUR: 7 * 86400, TIER_DAY: 90 * 86400}  # 每次汇总最多处理的时间跨度
+_PURGE_BATCH = 5000  # 每次清理最多删除的行数
+
+
+@functools.lru_cache(maxsize=1024)
+def _local_midnight(year, month, day):
+    return time.mktime((year, month, day, 0, 0, 0, 0, 0, -1))
+
+
+def bucket_start(ts, tier):
+    """ts 所在汇总区间的起点（小时按整点，日按 ts 当地日期的零点，夏令时切换日为 23 或 25 小时）"""
+    if tier >= TIER_DAY:
+        local = time.localtime(ts)
+        return _local_midnight(local.tm_year, local.tm_mon, local.tm_mday)
+    return math.floor(ts / tier) * tier
+
+
+def _aggregate(rows, tier):
+    """把按时间排序的 (ts, open, high, low, close, count) 合并到 tier 的区间，返回同样格式的列表"""
+    result = []
+    for ts, open_, high, low, close, count in rows:
+        bucket = bucket_start(ts, tier)
+        if result and result[-1][0] == bucket:
+            last = result[-1]
+            last[2] = max(last[2], high)
+            last[3] = min(last[3], low)
+            last[4] = close
+            last[5] += count
+        else:
+            result.append([bucket, open_, high, low, close, count])
+    return [tuple(row) for row in result]
+
+
+_STOP = object()
+
+
+class PriceHistory:
+    """SQLite 价格历史（线程安全）
+
+    - record()：入队后立即返回；写线程在首次写入时启动
+    - 写线程攒够 batch_size 条或等待 flush_interval 秒后提交一批；写入失败的批次计数后丢弃，不影响抓取
+    - query() / query_series()：每次查询使用独立的只读连接（WAL 下读写互不阻塞）
+    - 汇总与清理在写线程上每隔 compact_interval 秒推进一小块，积压未处理完时在下一次空闲时继续
+    - raw_retention / hourly_retention：原始价格与小时汇总的保留秒数（0 为永久保留）；日汇总永久保留
+    - 早于汇总进度的价格（record(ts=) 补录、时钟回拨等）写入时同步修正汇总，见 _backfill()
+    """
+
+    def __init__(self, path, batch_size=200, flush_interval=2.0, raw_retention=30 * 86400,
+                 hourly_retention=365 * 86400, compact_interval=60.0, clock=time.time):
+        self.path = path
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = max(0.05, float(flush_interval))
+        self.retention = {TIER_RAW: float(raw_retention or 0), TIER_HOUR: float(hourly_retention or 0)}
+        self.compact_interval = max(0.0, float(compact_interval))
+        self._clock = clock
+        self._next_compact = 0.0
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._writer = None
+        self._closed = False
+        self._written = 0
+        self._batches = 0
+        self._errors = 0
+        self._commit_time = 0.0
+        self._rolled = {TIER_HOUR: 0, TIER_DAY: 0}   # 写入的汇总区间数
+        self._purged = {TIER_RAW: 0, TIER_HOUR: 0}   # 清理的行数
+        self._compact_time = 0.0
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")  # WAL 下 NORMAL 只在检查点时 fsync，断电最多丢失最近几批
+        return conn
+
+    def _ensure_writer(self):
+        with self._lock:
+            if self._writer is not None or self._closed:
+                return
+            self._writer = threading.Thread(target=self._write_loop, name='price-history-writer', daemon=True)
+            self._writer.start()
+
+    def record(self, server, currency, source, price, ts=None):
+        """记录一个被采纳的价格（不阻塞）"""
+        if self._closed or price <= 0:
+            return
+        self._ensure_writer()
+        self._queue.put((self._clock() if ts is None else float(ts), str(server), str(currency),
+                         str(source or ''), float(price)))
+
+    def _write_loop(self):
+        try:
+            conn = self._connect()
+            for statement in _SCHEMA:
+                conn.execute(statement)
+            conn.commit()
+        except sqlite3.Error:
+            # 数据库不可用：继续消费队列（只计数），避免队列无限增长
+            conn = None
+        stop = False
+        while not stop:
+            batch = []
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                self._maybe_compact(conn)
+                continue
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if item is _STOP:
+                    stop = True
+                    self._queue.task_done()
+                    break
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            if batch:
+                self._write_batch(conn, batch)
+                for _ in batch:
+                    self._queue.task_done()
+            if not stop:
+                self._maybe_compact(conn)
+        if conn is not None:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+
+    def _write_batch(self, conn, batch):
+        started = time.perf_counter()
+        try:
+            if conn is None:
+                raise sqlite3.OperationalError("database unavailable")
+            with conn:
+                conn.executemany(
+                    "INSERT INTO price_ticks (ts, server, currency, source, price) VALUES (?, ?, ?, ?, ?)", batch)
+                self._backfill(conn, batch)
+        except sqlite3.Error:
+            with self._lock:
+                self._errors += len(batch)
+            return
+        with self._lock:
+            self._written += len(batch)
+            self._batches += 1
+            self._commit_time += time.perf_counter() - started
+
+    def _backfill(self, conn, batch):
+        """修正早于汇总进度的价格，避免它们未被汇总就随所在时段一起被清理
+
+        下一层数据仍完整时（小时层：原始价格未清理；日层：当日的小时汇总未清理），把该层的汇总进度退回到最早一条所在的区间，
+        删除其后的汇总，由后续汇总重新计算；否则直接合并进已有的汇总区间（见 _MERGE_ROLLUP）。与写入在同一事务中提交。
+        """
+        hour_rolled, hour_purged = self._state(conn, TIER_HOUR)
+        if not hour_rolled or min(ts for ts, *_ in batch) >= hour_rolled:
+            return
+        day_rolled = self._state(conn, TIER_DAY)[0]
+        raw_purged = self._state(conn, TIER_RAW)[1]
+        rewind = {}
+        merge = []
+        for ts, server, currency, _source, price in batch:
+            if ts >= hour_rolled:
+                continue
+            hour = bucket_start(ts, TIER_HOUR)
+            if ts >= raw_purged:
+                rewind[TIER_HOUR] = min(rewind.get(TIER_HOUR, hour_rolled), hour)
+            elif ts >= hour_purged:
+                merge.append((TIER_HOUR, currency, server, hour, price, price, price, price, 1))
+            if ts < day_rolled:
+                day = bucket_start(ts, TIER_DAY)
+                if day >= hour_purged:
+                    rewind[TIER_DAY] = min(rewind.get(TIER_DAY, day_rolled), day)
+                else:
+                    merge.append((TIER_DAY, currency, server, day, price, price, price, price, 1))
+        for tier, start in rewind.items():
+            conn.execute("DELETE FROM price_rollups WHERE tier = ? AND bucket >= ?", (tier, start))
+            self._set_state(conn, tier, start, self._state(conn, tier)[1])
+        conn.executemany(_MERGE_ROLLUP, merge)
+
+    def _maybe_compact(self, conn):
+        now = time.monotonic()
+        if conn is None or now < self._next_compact:
+            return
+        started = time.perf_counter()
+        try:
+            more = self._compact_step(conn)
+        except sqlite3.Error:
+            more = False
+        with self._lock:
+            self._compact_time += time.perf_counter() - started
+        # 还有积压时下一次空闲立即继续，否则等待 compact_interval
+        self._next_compact = now if more else now + self.compact_interval
+
+    def _compact_step(self, conn):
+        """推进一小块汇总与清理；还有积压时返回 True"""
+        now = self._clock()
+        more = self._roll(conn, TIER_HOUR, now)
+        more = self._roll(conn, TIER_DAY, now) or more
+        more = self._purge(conn, TIER_RAW, now) or more
+        more = self._purge(conn, TIER_HOUR, now) or more
+        return more
+
+    @staticmethod
+    def _state(conn, tier):
+        row = conn.execute("SELECT rolled, purged FROM rollup_state WHERE tier = ?", (tier,)).fetchone()
+        return row if row is not None else (0.0, 0.0)
+
+    @staticmethod
+    def _set_state(conn, tier, rolled, purged):
+        conn.execute("INSERT INTO rollup_state (tier, rolled, purged) VALUES (?, ?, ?)"
+                     " ON CONFLICT (tier) DO UPDATE SET rolled = excluded.rolled, purged = excluded.purged",
+                     (tier, rolled, purged))
+
+    def _roll(self, conn, tier, now):
+        """把下一层中尚未汇总的已结束区间汇总进 tier（每次最多 _COMPACT_SPAN 秒）"""
+        rolled, purged = self._state(conn, tier)
+        if tier == TIER_HOUR:
+            # 只汇总已结束的小时，并留出余量让仍在队列中的价格先落盘
+            limit = bucket_start(now - 60 - self.flush_interval, TIER_HOUR)
+        else:
+            limit = bucket_start(self._state(conn, TIER_HOUR)[0], TIER_DAY)
+        if not rolled:
+            if tier == TIER_HOUR:
+                first = conn.execute("SELECT MIN(ts) FROM price_ticks").fetchone()[0]
+            else:
+                first = conn.execute("SELECT MIN(bucket) FROM price_rollups WHERE tier = ?", (TIER_HOUR,)).fetchone()[0]
+            if first is None:
+                return False
+            rolled = bucket_start(first, tier)
+        stop = min(limit, bucket_start(rolled + _COMPACT_SPAN[tier], tier))
+        if stop <= rolled:
+            return False
+        if tier == TIER_HOUR:
+            rows = conn.execute(
+                "SELECT currency, server, ts, price, price, price, price, 1 FROM price_ticks"
+                " WHERE ts >= ? AND ts < ? ORDER BY currency, server, ts", (rolled, stop)).fetchall()
+        else:
+            rows = conn.execute(
+                "SELECT currency, server, bucket, open, high, low, close, count FROM price_rollups"
+                " WHERE tier = ? AND bucket >= ? AND bucket < ? ORDER BY currency, server, bucket",
+                (TIER_HOUR, rolled, stop)).fetchall()
+        series = {}
+        for currency, server, *tick in rows:
+            series.setdefault((currency, server), []).append(tick)
+        values = [(tier, currency, server) + bucket
+                  for (currency, server), ticks in series.items() for bucket in _aggregate(ticks, tier)]
+        with conn:
+            conn.executemany(_UPSERT_ROLLUP, values)
+            self._set_state(conn, tier, stop, purged)
+        with self._lock:
+            self._rolled[tier] += len(values)
+        return stop < limit
+
+    def _purge(self, conn, tier, now):
+        """删除超出保留期且已汇总进上一层的数据（每次最多 _PURGE_BATCH 行）"""
+        retention = self.retention[tier]
+        if not retention:
+            return False
+        upper = TIER_HOUR if tier == TIER_RAW else TIER_DAY
+        cutoff = bucket_start(min(now - retention, self._state(conn, upper)[0]), upper)
+        rolled, purged = self._state(conn, tier)
+        if cutoff <= purged:
+            return False
+        with conn:
+            if tier == TIER_RAW:
+                cur = conn.execute("DELETE FROM price_ticks WHERE rowid IN"
+                                   " (SELECT rowid FROM price_ticks WHERE ts < ? LIMIT ?)", (cutoff, _PURGE_BATCH))
+            else:
+                cur = conn.execute("DELETE FROM price_rollups WHERE rowid IN"
+                                   " (SELECT rowid FROM price_rollups WHERE tier = ? AND bucket < ? LIMIT ?)",
+                                   (TIER_HOUR, cutoff, _PURGE_BATCH))
+            more = cur.rowcount >= _PURGE_BATCH
+            if not more:
+                self._set_state(conn, tier, rolled, cutoff)
+        with self._lock:
+            self._purged[tier] += max(0, cur.rowcount)
+        return more
+
+    def flush(self, timeout=None):
+        """等待已入队的价格全部落盘（不会让写线程提前提交，最多多等一个 flush_interval）；超时返回 False"""
+        if self._writer is None:
+            return True
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def query(self, currency, start=None, end=None, server=None, source=None, limit=None):
+        """按时间升序返回 [(ts, server, currency, source, price)]；start / end 为 time.time() 时间戳（含两端）"""
+        sql = "SELECT ts, server, currency, source, price FROM price_ticks WHERE currency = ?"
+        params = [currency]
+        if start is not None:
+            sql += " AND ts >= ?"
+            params.append(float(start))
+        if end is not None:
+            sql += " AND ts <= ?"
+            params.append(float(end))
+        if server is not None:
+            sql += " AND server = ?"
+            params.append(server)
+        if source is not None:
+            sql += " AND source = ?"
+            params.append(source)
+        sql += " ORDER BY ts"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        return self._read(lambda conn: conn.execute(sql, params).fetchall())
+
+    def query_series(self, currency, start, end=None, resolution=0, server=DEFAULT_SERVER):
+        """按时间升序返回 [(ts, open, high, low, close, count)]
+
+        resolution 为需要的最小时间粒度（秒）：< 3600 读原始价格（每条 open=high=low=close），>= 3600 读小时汇总，
+        >= 86400 读日汇总。细层已被清理的较早时段由更粗一层补齐，尚未汇总的最近时段由更细一层即时汇总。
+        """
+        end = self._clock() if end is None else float(end)
+        tier = max(t for t in TIERS if t <= resolution)
+        return self._read(lambda conn: self._read_series(conn, tier, currency, server, float(start), end))
+
+    def _read_series(self, conn, tier, currency, server, start, end, before=math.inf):
+        """tier 中与 [start, end] 相交且早于 before 的数据"""
+        rows = []
+        rolled, purged = self._state(conn, tier)
+        if tier == TIER_RAW:
+            rolled = math.inf  # 原始层无需汇总
+        index = TIERS.index(tier)
+        if purged > start and tier != TIER_DAY:
+            rows.extend(self._read_series(conn, TIERS[index + 1], currency, server, start, end, min(before, purged)))
+        lo = max(start, purged)
+        if tier == TIER_RAW:
+            rows.extend((ts, price, price, price, price, 1) for ts, price in conn.execute(
+                "SELECT ts, price FROM price_ticks WHERE currency = ? AND server = ? AND ts >= ? AND ts <= ? AND ts < ?"
+                " ORDER BY ts", (currency, server, lo, end, before)))
+            return rows
+        rows.extend(conn.execute(
+            "SELECT bucket, open, high, low, close, count FROM price_rollups"
+            " WHERE tier = ? AND currency = ? AND server = ? AND bucket >= ? AND bucket <= ? AND bucket >= ? AND bucket < ?"
+            " ORDER BY bucket", (tier, currency, server, bucket_start(lo, tier), end, purged, min(before, rolled))).fetchall())
+        if end >= rolled and before > rolled:
+            recent = self._read_series(conn, TIERS[index - 1], currency, server,
+                                       max(rolled, bucket_start(lo, tier)), end, before)
+            rows.extend(_aggregate(recent, tier))
+        return rows
+
+    def _read(self, fn):
+        if not os.path.exists(self.path):
+            return []
+        try:
+            conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, timeout=10)
+            try:
+                return fn(conn)
+            finally:
+                conn.close()
+        except sqlite3.Error:
+            return []
+
+    def format_stats(self):
+        with self._lock:
+            avg = self._commit_time * 1000 / self._batches if self._batches else 0.0
+            per_batch = self._written / self._batches if self._batches else 0.0
+            return (f"written={self._written} batches={self._batches} avg_batch={per_batch:.1f} "
+                    f"avg_commit={avg:.1f}ms pending={self._queue.unfinished_tasks} dropped={self._errors} "
+                    f"rolled={self._rolled[TIER_HOUR]}h/{self._rolled[TIER_DAY]}d "
+                    f"purged={self._purged[TIER_RAW]}raw/{self._purged[TIER_HOUR]}h "
+                    f"compact={self._compact_time * 1000:.0f}ms")
+
+    def close(self, timeout=5.0):
+        """写完队列中剩余的价格后停止写线程"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            writer = self._writer
+        if writer is not None:
+            self._queue.put(_STOP)
+            writer.join(timeout)
+
+
+# 全局实例（抓取线程写入，图表、统计等组件查询）
+_price_history = None
+_price_history_lock = threading.Lock()
+
+
+def get_price_history():
+    """获取全局价格历史（数据库存放于应用数据目录）"""
+    global _price_history
+    if _price_history is None:
+        with _price_history_lock:
+            if _price_history is None:
+                cfg = Config.PRICE_HISTORY
+                path = os.path.join(Config.get_app_data_dir(), cfg.get("filename", "price_history.sqlite3"))
+                _price_history = PriceHistory(
+                    path, cfg.get("batch_size", 200), cfg.get("flush_interval", 2.0),
+                    raw_retention=cfg.get("raw_retention_days", 30) * 86400,
+                    hourly_retention=cfg.get("hourly_retention_days", 365) * 86400,
+                    compact_interval=cfg.get("compact_interval", 60))
+    return _price_history
+
+
+def get_enabled_price_history():
+    """价格历史已启用（Config.PRICE_HISTORY["enabled"]）时返回全局实例；未启用或初始化失败时返回 None"""
+    if not Config.PRICE_HISTORY.get("enabled", True):
+        return None
+    try:
+        return get_price_history()
+    except Exception:
+        return None
+
+
+def close_price_history():
+    """写完剩余价格并关闭全局价格历史（程序退出时调用）"""
+    global _price_history
+    with _price_history_lock:
+        if _price_history is not None:
+            _price_history.close()
+            _price_history = None
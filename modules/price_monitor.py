@@ -4,20 +4,35 @@
 """
 
 import re
-import requests
 import time
 import os
-import sys
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from bs4 import BeautifulSoup
-from datetime import datetime
+import sys
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
+from concurrent.futures import TimeoutError as FuturesTimeoutError
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
-                            QLineEdit, QGridLayout, QScrollArea)
+                            QLineEdit, QGridLayout, QScrollArea, QComboBox)
 from PyQt5.QtCore import Qt, QThread, pyqtSignal, QTimer
 from PyQt5.QtGui import QFont
 
 from modules.config import Config
-from modules.price_sources import parse_dd373, parse_7881, parse_uu898
+from modules.http_pool import get_http_pool, http2_available, HostLimiter
+from modules.charset_resolver import get_charset_resolver
+from modules.http_compression import accept_encoding, get_transfer_stats
+from modules import price_async
+from modules.price_cache import get_validator_cache
+from modules.price_stream import StreamingPage, TargetWatcher
+from modules.price_retry import get_retry_policy, classify_error, RETRY_CONNECT
+from modules.price_health import (get_source_health, get_circuit_breaker, OUTCOME_OK,
+                                  OUTCOME_EMPTY, OUTCOME_CHALLENGED, OUTCOME_ERROR)
+from modules.price_registry import get_price_registry, server_name, DEFAULT_SERVER
+from modules.price_parse_pool import get_parse_pool
+from modules.price_schedule import get_refresh_scheduler
+from modules.price_history import get_enabled_price_history
+from modules.price_ticks import get_tick_store
+from modules.price_stats import get_price_stats
+from modules.price_sources import (parse_page, summarize_quotes, get_parse_stats, stream_target, is_challenge_page,
+                                   is_challenge_head, get_challenge_stats)
 
 
 # 调试开关：
@@ -43,113 +58,546 @@ def _dlog(msg: str):
             pass
 
 
-class PriceScraper(QThread):
-    """价格爬取线程类"""
-    price_updated = pyqtSignal(str, float)
+# 单次刷新后每种货币的价格状态
+PRICE_FRESH = "fresh"    # 本轮刷新拿到了价格
+PRICE_STALE = "stale"    # 本轮未拿到，沿用上次价格（由界面根据是否已有价格判定）
+PRICE_FAILED = "failed"  # 本轮未拿到价格
+
+# 单个请求的超时上限（秒）；启用刷新截止时间后会随剩余时间缩短
+REQUEST_TIMEOUT = 8
+# 剩余时间低于该值（秒）时不再发起新请求
+MIN_REQUEST_TIMEOUT = 0.2
+
+
+class _SlotTimeout(TimeoutError):
+    """等待同一主机的请求名额超时（本机排队，未向站点发出请求）"""
+
+
+class PriceScraper(QThread):
+    """价格爬取线程类
+
+    一轮刷新覆盖 区服×货币 矩阵中的每一格（PriceKey），每格按来源优先级依次尝试；
+    同一主机的并发请求数受 per_host_limit 限制，同一轮内相同 URL 只下载、解析一次。
+    """
+    price_updated = pyqtSignal(str, str, float)  # 区服, 货币, 价格
+    price_status = pyqtSignal(str, str, str)  # 区服, 货币, PRICE_FRESH / PRICE_FAILED
+    price_quotes = pyqtSignal(str, str, str, object)  # 区服, 货币, 站点, summarize_quotes() 的结果
     
-    def __init__(self):
-        super().__init__()
-        # 每种货币的价格来源，按优先级：DD373 → UU898 → 7881
-        self.currency_sources = {
-            "divine": [
-                ("dd373", "https://www.dd373.com/s-bcntax-c-n80v8p-h32hgr-5g0bqf.html"),
-                ("uu898", "https://www.uu898.com/newTrade-1724-c1366-4745-s73014/"),
-                ("7881",  "https://search.7881.com/G6186-100001-G6186P002-G6186P002001-0.html?pageNum=1")
-            ],
-            "exalted": [
-                ("dd373", "https://www.dd373.com/s-bcntax-c-bkfnrd-h32hgr-5g0bqf.html"),
-                ("uu898", "https://www.uu898.com/newTrade-1724-c1367-4745-s73014/"),
-                ("7881",  "https://search.7881.com/G6186-100026-G6186P002-G6186P002001-0.html?pageNum=1")
-            ],
-            "chaos": [
-                ("dd373", "https://www.dd373.com/s-bcntax-c-mxgtdd-h32hgr-5g0bqf.html"),
-                ("uu898", "https://www.uu898.com/newTrade-1724-c1368-4745-s73014/"),
-                ("7881",  "https://search.7881.com/G6186-100087-G6186P002-G6186P002001-0.html?pageNum=1")
-            ],
-            "chance": [
-                ("dd373", "https://www.dd373.com/s-bcntax-c-apww35-h32hgr-5g0bqf.html"),
-                ("uu898", "https://www.uu898.com/newTrade-1724-c1376-4745-s73014/"),
-                ("7881",  "https://search.7881.com/G6186-100110-G6186P002-G6186P002001-0.html?pageNum=1")
-            ],
-        }
+    def __init__(self, servers=None, currencies=None):
+        super().__init__()
+        self._deadline = None
+        self._emitted = set()
+        self._flights = {}  # URL -> Future，同一轮内相同 URL 的请求共用一次下载与解析
+        self._flight_lock = threading.Lock()
+        self._host_limiter = HostLimiter(Config.PRICE_SCRAPER.get("per_host_limit", 2))
+        # 区服×货币 的价格来源（来自价格来源注册表），按站点顺序：DD373 → UU898 → 7881
+        registry = get_price_registry()
+        for error in registry.errors:
+            _dlog(f"price source skipped: {error}")
+        if servers is None:
+            servers = Config.PRICE_SCRAPER.get("servers") or None
+        self.source_matrix = registry.source_matrix(servers, currencies)  # currencies 为空时抓取全部货币
         
     def run(self):
-        """并发抓取价格（最多4并发），并加入轻微错峰延迟"""
+        """按配置选择抓取后端：线程池（默认）或单事件循环异步引擎"""
+        budget = float(Config.PRICE_SCRAPER.get("refresh_deadline", 0) or 0)
+        self._deadline = time.monotonic() + budget if budget > 0 else None
+        self._emitted = set()
+        self._flights = {}
+        backend = Config.PRICE_SCRAPER.get("backend", "thread")
+        if backend == "async" and price_async.is_available():
+            self._run_async()
+        else:
+            if backend == "async":
+                _dlog("async backend requested but httpx is not installed; falling back to threads")
+            self._run_threaded()
+        breaker = self._circuit_breaker()
+        if breaker is not None and breaker.end_round():
+            _dlog("all sites failed to connect this refresh; treating it as a local network outage")
+        for key in self.source_matrix:
+            if key not in self._emitted:
+                self.price_status.emit(key.server, key.currency, PRICE_FAILED)
+                _dlog(f"no price for {key} this refresh")
+        self._save_caches()
+
+    def _remaining(self):
+        """距刷新截止时间的剩余秒数；未设置截止时间时返回 None"""
+        if self._deadline is None:
+            return None
+        return self._deadline - time.monotonic()
+
+    def _request_timeout(self):
+        """当前请求可用的超时：不超过 REQUEST_TIMEOUT，也不超过刷新剩余时间"""
+        remaining = self._remaining()
+        if remaining is None:
+            return REQUEST_TIMEOUT
+        return min(REQUEST_TIMEOUT, remaining)
+
+    @staticmethod
+    def _validator_cache():
+        """条件请求缓存；未启用或初始化失败时返回 None"""
+        if not Config.PRICE_SCRAPER.get("conditional_get", True):
+            return None
+        try:
+            return get_validator_cache()
+        except Exception:
+            return None
+
+    @staticmethod
+    def _source_health():
+        """来源健康度统计；初始化失败时返回 None"""
+        try:
+            return get_source_health()
+        except Exception:
+            return None
+
+    @staticmethod
+    def _circuit_breaker():
+        """站点熔断器；未启用时返回 None"""
+        if not Config.PRICE_SCRAPER.get("circuit_breaker", True):
+            return None
+        try:
+            return get_circuit_breaker()
+        except Exception:
+            return None
+
+    def _ordered_sources(self, key, sources):
+        """启用自适应排序时按来源健康度重排尝试顺序"""
+        health = self._source_health()
+        if not Config.PRICE_SCRAPER.get("adaptive_order", True) or health is None:
+            return sources
+        ordered = health.order(sources)
+        if [s for s, _ in ordered] != [s for s, _ in sources]:
+            _dlog(f"order {key}: {' > '.join(s for s, _ in ordered)}")
+        return ordered
+
+    def _save_caches(self):
+        cache = self._validator_cache()
+        if cache is not None:
+            cache.save()
+        health = self._source_health()
+        if health is not None:
+            _dlog(f"source health: {health.format_stats()}")
+            health.save()
+        breaker = self._circuit_breaker()
+        if breaker is not None:
+            _dlog(f"circuit: {breaker.format_stats()}")
+        _dlog(f"charset: {get_charset_resolver().format_stats()}")
+        _dlog(f"transfer: {get_transfer_stats().format_stats()}")
+        _dlog(f"parse: {get_parse_stats().format_stats()}")
+        if int(Config.PRICE_SCRAPER.get("parse_processes", 0) or 0) > 0:
+            _dlog(f"parse pool: {get_parse_pool().format_stats()}")
+        _dlog(f"challenge: {get_challenge_stats().format_stats()}")
+        history = get_enabled_price_history()
+        if history is not None:
+            _dlog(f"history: {history.format_stats()}")
+
+    def _run_async(self):
+        """在本线程内运行异步引擎，所有 区服×货币×来源 请求共用一个事件循环"""
+        try:
+            per_host = Config.PRICE_SCRAPER.get("per_host_limit", 2)
+            _dlog(f"start price refresh with async engine (per-host limit {per_host})")
+            engine = price_async.AsyncPriceEngine(
+                build_headers=self._build_headers,
+                parse_price=self._parse_price,
+                per_host_limit=per_host,
+                validator_cache=self._validator_cache(),
+                health=self._source_health(),
+                breaker=self._circuit_breaker(),
+                http2=Config.HTTP_POOL.get("http2", False) and http2_available(),
+                deadline=self._deadline,
+                challenge_sniff_bytes=int(Config.PRICE_SCRAPER.get("challenge_sniff_bytes", 8192)),
+                log=_dlog,
+            )
+            ordered = {k: self._ordered_sources(k, s) for k, s in self.source_matrix.items()}
+            engine.run(ordered, self._emit_price)
+        except Exception as e:
+            _dlog(f"async engine exception: {e}")
+
+    def _emit_price(self, key, price, site):
+        self._emitted.add(key)
+        history = get_enabled_price_history()
+        if history is not None:
+            history.record(key.server, key.currency, site, price)
+        self.price_updated.emit(key.server, key.currency, price)
+        self.price_status.emit(key.server, key.currency, PRICE_FRESH)
+        _dlog(f"parsed {key} => {price} ({site})")
+
+    def _run_threaded(self):
+        """并发抓取价格（默认最多4并发），并加入轻微错峰延迟"""
         try:
-            _dlog("start price refresh with 4 workers (0/50/100/150ms stagger)")
-            # 受控并发为4；为每个请求增加微小错峰（0/50/100/150ms），降低瞬时并发尖峰
-            items = list(self.currency_sources.items())
-            with ThreadPoolExecutor(max_workers=4) as executor:
+            workers = max(1, int(Config.PRICE_SCRAPER.get("max_workers", 4)))
+            items = list(self.source_matrix.items())
+            _dlog(f"start price refresh: {len(items)} jobs, {workers} workers, "
+                  f"per-host limit {self._host_limiter.limit} (50ms stagger)")
+            # 受控并发；为每个请求增加微小错峰（0/50/100/150ms...），降低瞬时并发尖峰
+            executor = ThreadPoolExecutor(max_workers=workers)
+            try:
                 futures = {}
-                for i, (currency, sources) in enumerate(items):
+                for i, (key, sources) in enumerate(items):
                     delay_ms = i * 50  # 每个请求递增 50ms 的轻微延迟
-                    # 注意：不共享 Session；每个任务自行尝试多来源
-                    futures[executor.submit(self._get_currency_price_with_delay, currency, sources, delay_ms)] = currency
-                for future in as_completed(futures):
-                    currency = futures.get(future)
+                    # 连接由全局连接池共享复用；每个任务自行尝试多来源
+                    futures[executor.submit(self._get_currency_price_with_delay, key, sources, delay_ms)] = key
+                # 到达刷新截止时间时不再等待未完成的货币，已拿到的价格照常发出
+                for future in as_completed(futures, timeout=self._remaining()):
+                    key = futures.get(future)
                     try:
-                        price = future.result()
+                        price, site = future.result()
                     except Exception:
                         continue
                     if price > 0:
-                        self.price_updated.emit(currency, price)
-                        _dlog(f"parsed {currency} => {price}")
+                        self._emit_price(key, price, site)
                     # 轻微让步，避免过于频繁地触发UI更新
                     self.msleep(10)
+            except FuturesTimeoutError:
+                _dlog("refresh deadline reached; delivering partial results")
+            finally:
+                # 截止后仍在进行的请求的超时已被压缩到剩余时间内，无需等待它们结束
+                executor.shutdown(wait=False, cancel_futures=True)
+            _dlog(f"http pool: {get_http_pool().format_stats()}")
+            _dlog(f"host limiter: {self._host_limiter.format_stats()}")
         except Exception:
             pass
 
-    def _get_currency_price_with_delay(self, currency, sources, delay_ms=0):
-        """在请求前增加轻微延迟；按优先级依次尝试来源，成功即返回价格，失败返回0.0"""
+    def _get_currency_price_with_delay(self, key, sources, delay_ms=0):
+        """在请求前增加轻微延迟；按优先级依次尝试来源，成功即返回 (价格, 来源)，失败返回 (0.0, None)"""
         try:
             if delay_ms and delay_ms > 0:
                 time.sleep(delay_ms / 1000.0)
         except Exception:
             pass
+        sources = self._ordered_sources(key, sources)
+        mode = Config.PRICE_SCRAPER.get("hedge_mode", "off")
+        if mode in ("hedge", "race") and len(sources) > 1:
+            return self._get_currency_price_hedged(key, sources, mode)
         for site, url in sources:
-            price = self.get_price_from_site(site, url)
-            _dlog(f"try {currency}@{site} => {price}")
+            if self._request_timeout() < MIN_REQUEST_TIMEOUT:
+                break
+            price = self.get_price_from_site(site, url, key=key)
+            _dlog(f"try {key}@{site} => {price}")
             if price > 0:
-                return price
-        return 0.0
+                return price, site
+        return 0.0, None
+
+    def _get_currency_price_hedged(self, key, sources, mode):
+        """对冲抓取：主来源超过 hedge_delay 未返回时并行启动下一来源（race 模式下全部同时启动）
+
+        取价遵循优先级：某来源拿到有效价格时，若更高优先级的来源仍在进行，最多再等待一个 hedge_delay；
+        决出结果后通知其余请求停止下载、放弃解析（关闭连接并释放主机名额），尚未启动的请求直接取消。
+        """
+        hedge_delay = max(0.0, Config.PRICE_SCRAPER.get("hedge_delay_ms", 1500) / 1000.0)
+        launch_gap = 0.0 if mode == "race" else hedge_delay
+        cancel_event = threading.Event()
+        results = {}   # 来源序号 -> 价格
+        pending = {}   # future -> 来源序号
+        launched = 0
+        next_launch = 0.0
+        grace_deadline = None
+        started = time.monotonic()
+        executor = ThreadPoolExecutor(max_workers=len(sources))
+        try:
+            while True:
+                now = time.monotonic()
+                # 到达对冲时间点或当前无在途请求时，启动下一个来源
+                while launched < len(sources) and (not pending or now >= next_launch):
+                    site, url = sources[launched]
+                    pending[executor.submit(self.get_price_from_site, site, url, cancel_event, key)] = launched
+                    launched += 1
+                    next_launch = now + launch_gap
 
-    def _fetch_html(self, url):
-        headers = {
+                winner = None
+                for i in range(len(sources)):
+                    if i not in results:
+                        break
+                    if results[i] > 0:
+                        winner = i
+                        break
+                if winner is None:
+                    valid = [i for i, p in results.items() if p > 0]
+                    if valid:
+                        if grace_deadline is None:
+                            grace_deadline = now + hedge_delay
+                        if now >= grace_deadline or not pending:
+                            winner = min(valid)
+
+                if winner is not None:
+                    _dlog(f"hedge {key}: {sources[winner][0]} wins after {now - started:.2f}s "
+                          f"(launched {launched}/{len(sources)}, mode={mode})")
+                    return results[winner], sources[winner][0]
+                if not pending and launched >= len(sources):
+                    return 0.0, None
+
+                timeout = None
+                if launched < len(sources):
+                    timeout = max(0.0, next_launch - now)
+                if grace_deadline is not None:
+                    grace_left = max(0.0, grace_deadline - now)
+                    timeout = grace_left if timeout is None else min(timeout, grace_left)
+                remaining = self._remaining()
+                if remaining is not None:
+                    if remaining <= 0:
+                        valid = [i for i, p in results.items() if p > 0]
+                        return (results[min(valid)], sources[min(valid)][0]) if valid else (0.0, None)
+                    timeout = remaining if timeout is None else min(timeout, remaining)
+                done, _ = wait(list(pending), timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    idx = pending.pop(future)
+                    try:
+                        results[idx] = float(future.result() or 0.0)
+                    except Exception:
+                        results[idx] = 0.0
+                    _dlog(f"try {key}@{sources[idx][0]} => {results[idx]} (hedged)")
+        finally:
+            cancel_event.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    @staticmethod
+    def _build_headers(url):
+        return {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/134.0.0.0 Safari/537.36',
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
             'Accept-Language': 'zh-CN,zh;q=0.9',
+            'Accept-Encoding': accept_encoding(),
             'Referer': url.split('/')[0] + '//' + url.split('/')[2] if '//' in url else ''
         }
-        resp = requests.get(url, headers=headers, timeout=8)
+
+    def _fetch_html(self, url, extra_headers=None, site=None, cancel_event=None, timeout=REQUEST_TIMEOUT):
+        """下载页面，返回 (response, html, page)；304 时 html 为空串、page 为 None
+
+        响应体总是按块读取，page 为 StreamingPage（调用方负责 close）；cancel_event 置位（对冲已决出结果）时立即停止下载，
+        关闭后即释放主机名额与连接。流式模式下读到站点目标商品块即停止，否则读完整个响应体（读完的连接可以复用）。
+        """
+        headers = self._build_headers(url)
+        if extra_headers:
+            headers.update(extra_headers)
+        resp = get_http_pool().get(url, headers=headers, timeout=timeout, stream=True)
+        if resp.status_code == 304:
+            _dlog(f"GET {url} status=304 not modified")
+            resp.close()
+            return resp, "", None
+        stream = bool(Config.PRICE_SCRAPER.get("stream_mode", False))
+        page = self._read_body(site, resp, stream, cancel_event)
+        # 不使用 resp.text：requests 对未声明字符集的响应会在整页上运行 chardet
+        html = page.text()
+        ce, wire, _decoded = get_transfer_stats().record(resp, page.bytes_read)
+        _dlog(f"GET {url} status={resp.status_code} read={page.bytes_read}B wire={wire}B ce={ce} stream={stream} "
+              f"early_stop={page.stopped_early} capped={page.capped} cancelled={page.cancelled} "
+              f"challenged={page.challenged} content_length={resp.headers.get('Content-Length', 'NA')}")
+        return resp, html, page
+
+    def _read_body(self, site, resp, stream, cancel_event=None):
+        """两种模式都先检查开头 challenge_sniff_bytes 字节，命中挑战页即中止下载；否则按模式读到目标商品块或读完"""
+        sniff = int(Config.PRICE_SCRAPER.get("challenge_sniff_bytes", 8192))
+        challenge = lambda raw, encoding: is_challenge_head(raw, site, encoding, sniff)
+        if not stream:
+            page = StreamingPage(resp, cancel_event=cancel_event, challenge=challenge, sniff_bytes=sniff)
+            page.read_rest()
+            return page
+        caps = Config.PRICE_SCRAPER.get("stream_byte_caps", {})
+        page = StreamingPage(resp, byte_cap=caps.get(site, caps.get("default", 0)),
+                             cancel_event=cancel_event, deadline=self._deadline,
+                             challenge=challenge, sniff_bytes=sniff)
+        target = stream_target(site, int(Config.PRICE_SCRAPER.get("quote_depth", 0) or 0))
+        if target:
+            page.read_until(TargetWatcher(*target))
+        else:
+            page.read_rest()
+        return page
+
+    def _fetch_with_retry(self, site, url, extra_headers=None, cancel_event=None):
+        """按站点重试策略下载页面：可重试的错误/状态码退避后重试，退避不突破刷新截止时间"""
+        policy = get_retry_policy(site)
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                slot = self._host_limiter.acquire(url, timeout=self._request_timeout())
+                if slot is None:
+                    raise _SlotTimeout(f"waiting for a {site} request slot timed out")
+                try:
+                    resp, html, page = self._fetch_html(url, extra_headers, site, cancel_event, self._request_timeout())
+                finally:
+                    self._host_limiter.release(slot)
+            except Exception as e:
+                reason = policy.retry_reason(attempt, exc=e)
+                if not reason or not self._backoff(site, policy, attempt, reason, cancel_event):
+                    raise
+                continue
+            reason = policy.retry_reason(attempt, status=resp.status_code)
+            if reason and self._is_challenged(site, html, page):
+                reason = None  # 挑战页重试也只会再次得到挑战页，直接换下一来源
+            if reason and self._backoff(site, policy, attempt, reason, cancel_event):
+                if page is not None:
+                    page.close()
+                continue
+            return resp, html, page
+
+    @staticmethod
+    def _is_challenged(site, html, page):
+        """下载途中已判定为挑战页，或已读到的内容开头命中特征且没有列表内容（只用于决定是否重试）"""
+        if page is not None and page.challenged:
+            return True
+        return bool(html) and is_challenge_page(html, site) and not get_price_registry().has_listing(html, site)
+
+    def _backoff(self, site, policy, attempt, reason, cancel_event=None):
+        """重试前等待；刷新剩余时间不足或请求已被对冲取消时返回 False"""
+        delay = policy.backoff(attempt)
+        if not policy.fits_budget(delay, self._remaining()):
+            _dlog(f"{site} {reason}: no budget left for retry")
+            return False
+        _dlog(f"{site} {reason}; retry {attempt + 1}/{policy.max_attempts} in {delay:.2f}s")
+        if cancel_event is not None:
+            return not cancel_event.wait(delay)
+        time.sleep(delay)
+        return True
+
+    def get_price_from_site(self, site, url, cancel_event=None, key=None):
+        """按站点解析价格：失败返回0.0；同一轮内已有请求在下载/解析相同 URL 时等待并复用其结果"""
+        with self._flight_lock:
+            flight = self._flights.get(url)
+            owner = flight is None
+            if owner:
+                flight = self._flights[url] = Future()
+        if not owner:
+            try:
+                price = flight.result(timeout=self._remaining())
+            except Exception:
+                return 0.0
+            if price is not None:
+                _dlog(f"{site} dedup {key}: reuse price={price}")
+                return price
+            # 首个请求被对冲取消而未解析，由当前请求自行抓取
+            return self._get_price_from_site(site, url, cancel_event, key)
+        price = None
         try:
-            enc = (resp.encoding or '').lower()
-            if not enc or enc == 'iso-8859-1':
-                resp.encoding = getattr(resp, 'apparent_encoding', None) or 'utf-8'
-        except Exception:
-            pass
-        _dlog(f"GET {url} status={getattr(resp, 'status_code', 'NA')} len={len(getattr(resp, 'text', '') or '')} enc={getattr(resp, 'encoding', 'NA')}")
-        return resp.text or ""
+            price = self._get_price_from_site(site, url, cancel_event, key)
+            return price
+        finally:
+            if cancel_event is not None and cancel_event.is_set():
+                with self._flight_lock:
+                    if self._flights.get(url) is flight:
+                        del self._flights[url]
+                flight.set_result(None)
+            else:
+                flight.set_result(price or 0.0)
+
+    def _get_price_from_site(self, site, url, cancel_event=None, key=None):
+        """下载并解析单个来源页面：失败返回0.0（瞬时错误按站点重试策略重试）
+
+        cancel_event 被置位（对冲抓取已决出结果）时停止下载、跳过解析，直接返回0.0。
+        若缓存中有该 URL 的校验值则发送条件请求，304 时直接复用上次解析出的价格。
+        响应体开头命中挑战页特征且没有列表内容即中止下载，不解析、不重试，记为 challenged 后返回0.0；
+        开头未能识别的页面照常解析，取不到价格时再按已读到的内容检查挑战页特征。
+        """
+        if self._request_timeout() < MIN_REQUEST_TIMEOUT:
+            _dlog(f"{site} skipped: refresh deadline reached")
+            return 0.0
+        breaker = self._circuit_breaker()
+        if breaker is not None and not breaker.allow(site):
+            _dlog(f"{site} skipped: circuit {breaker.state(site)}")
+            return 0.0
+        page = None
+        outcome = OUTCOME_ERROR
+        connect_error = False
+        started = time.monotonic()
+        try:
+            cache = self._validator_cache()
+            conditional = cache.conditional_headers(url) if cache else None
+            resp, html, page = self._fetch_with_retry(site, url, conditional, cancel_event)
+            if resp.status_code == 304 and conditional:
+                cache.touch(url)
+                price = cache.cached_price(url)
+                _dlog(f"{site} not modified; reuse price={price}")
+                outcome = OUTCOME_OK
+                return price
+            if cancel_event is not None and cancel_event.is_set():
+                outcome = None  # 对冲已决出结果，未解析的请求不计入健康度
+                return 0.0
+            if page is not None and page.challenged:
+                outcome = OUTCOME_CHALLENGED
+                aborted = not page.exhausted
+                read = page.bytes_read
+                get_challenge_stats().record(site, aborted, read)
+                _dlog(f"{site} challenge page detected after {read}B" + ("; download aborted" if aborted else ""))
+                return 0.0
+            price = self._parse_price(site, html, key)
+            if price <= 0 and page is not None and page.stopped_early:
+                # 前缀不足以解析（页面结构与预期不符），继续读完剩余内容再解析一次
+                page.read_rest()
+                _dlog(f"{site} prefix inconclusive; read on to {page.bytes_read}B")
+                html = page.text()
+                price = self._parse_price(site, html, key)
+            if price > 0:
+                outcome = OUTCOME_OK
+            elif is_challenge_page(html, site):
+                # 开头未能识别（如响应头未声明编码的 GBK 页面），解析后按完整文本再判断一次
+                outcome = OUTCOME_CHALLENGED
+                get_challenge_stats().record(site, False, page.bytes_read if page is not None else 0)
+                _dlog(f"{site} challenge page detected")
+            else:
+                outcome = OUTCOME_EMPTY
+            if cache and price > 0 and resp.status_code == 200:
+                cache.store(url, resp.headers.get('ETag'), resp.headers.get('Last-Modified'), price)
+            return price
+        except _SlotTimeout as e:
+            outcome = None  # 没有联系站点，不计入健康度与熔断
+            _dlog(f"{site} skipped: {e}")
+            return 0.0
+        except Exception as e:
+            _dlog(f"{site} exception: {e}")
+            connect_error = classify_error(e) == RETRY_CONNECT
+            return 0.0
+        finally:
+            if page is not None:
+                page.close()
+            health = self._source_health()
+            if outcome is not None and health is not None:
+                health.record(site, outcome, time.monotonic() - started)
+            if breaker is not None:
+                if outcome is None:
+                    breaker.release(site)
+                else:
+                    breaker.record(site, outcome == OUTCOME_OK, connect_error)
 
-    def get_price_from_site(self, site, url):
-        """按站点解析价格：失败返回0.0（不做多轮重试）"""
+    def _parse_price(self, site, html, key=None):
+        """解析已下载的页面（线程/异步后端共用）：失败返回0.0
+
+        配置了解析进程数时交给常驻解析进程池，当前线程只等待结果（不持有 GIL）；进程池不可用时回退到本进程解析。
+        配置了报价深度时同一次解析还取出前 N 条报价，汇总后通过 price_quotes 信号发出。
+        """
         try:
-            html = self._fetch_html(url)
             if not html:
                 return 0.0
-            soup = BeautifulSoup(html, 'html.parser')
-            parser_map = {
-                'dd373': parse_dd373,
-                '7881': parse_7881,
-                'uu898': parse_uu898,
-            }
-            parser = parser_map.get(site)
-            if not parser:
+            if get_price_registry().site(site) is None:
                 return 0.0
-            price = float(parser(soup, html) or 0.0)
+            backend = Config.PRICE_SCRAPER.get("parse_backend", "lxml")
+            fast_path = Config.PRICE_SCRAPER.get("fast_path", True)
+            quote_depth = int(Config.PRICE_SCRAPER.get("quote_depth", 0) or 0) if key else 0
+            workers = int(Config.PRICE_SCRAPER.get("parse_processes", 0) or 0)
+            if workers > 0:
+                remaining = self._remaining()
+                try:
+                    _currency, _site, price, quotes = get_parse_pool(workers).parse(
+                        key, site, html, backend, fast_path, quote_depth,
+                        timeout=None if remaining is None else max(MIN_REQUEST_TIMEOUT, remaining))
+                except FuturesTimeoutError:
+                    _dlog(f"{site} parse abandoned: refresh deadline reached")
+                    return 0.0
+                except Exception as e:
+                    _dlog(f"{site} parse pool unavailable ({e!r}); parsing in-process")
+                    price, quotes = parse_page(site, html, backend, fast_path, quote_depth)
+            else:
+                price, quotes = parse_page(site, html, backend, fast_path, quote_depth)
             if price <= 0:
-                _dlog(f"{site} no match; preview='{(html[:200] or '').replace('\n',' ')}'")
+                preview = (html[:200] or '').replace('\n', ' ')
+                _dlog(f"{site} no match; preview='{preview}'")
                 return 0.0
             _dlog(f"{site} price={price}")
+            summary = summarize_quotes(quotes)
+            if summary is not None:
+                _dlog(f"{site} quotes depth={summary['depth']} median={summary['median']} "
+                      f"spread={summary['spread']:.4f} ({summary['spread_pct']:.1%}) stock={summary['stock']}")
+                self.price_quotes.emit(key.server, key.currency, site, summary)
             return price
         except Exception as e:
             _dlog(f"{site} exception: {e}")
@@ -160,6 +608,32 @@ class PriceScraper(QThread):
         return self.get_price_from_site('dd373', url)
 
 
+class HistorySeedThread(QThread):
+    """在后台读取价格历史中最近的价格，供价格页预热滚动统计与内存价格序列"""
+    
+    seeded = pyqtSignal(object)  # {(区服, 货币): [(ts, price)]}，按时间升序
+    
+    def __init__(self, servers, currencies, since, parent=None):
+        super().__init__(parent)
+        self.servers = list(servers)
+        self.currencies = list(currencies)
+        self.since = since
+    
+    def run(self):
+        result = {}
+        try:
+            history = get_enabled_price_history()
+            if history is not None:
+                for server in self.servers:
+                    for currency in self.currencies:
+                        ticks = [(row[0], row[4]) for row in history.query(currency, start=self.since, server=server)]
+                        if ticks:
+                            result[(server, currency)] = ticks
+        except Exception as e:
+            _dlog(f"history seed exception: {e}")
+        self.seeded.emit(result)
+
+
 class PriceMonitorTab(QWidget):
     """价格监控标签页类"""
     
@@ -167,18 +641,40 @@ class PriceMonitorTab(QWidget):
         super().__init__(parent)
         
         # 初始化属性
-        self.prices = Config.DEFAULT_PRICES.copy()  # 使用默认价格
         self.currency_colors = Config.CURRENCY_COLORS
         self.currency_names = Config.CURRENCY_NAMES
-        self.start_time = datetime.now()
-        self.countdown_seconds = 600  # 10分钟刷新一次
+        # 各货币按各自的间隔独立到期（见 Config.PRICE_SCHEDULE），定时器每秒只刷新已到期的货币
+        self.scheduler = get_refresh_scheduler()
+        self.scheduler.add(self.currency_names)
+        self.refreshing_currencies = []  # 本轮正在刷新的货币
+        self.ticks = get_tick_store()  # 最近的价格序列，供图表与统计读取
+        self.stats = get_price_stats()  # 各货币的滚动统计（均线、波动率、涨跌幅）
+        # 每轮刷新的区服；各区服的价格、状态与报价汇总分别保存，prices / price_status / price_quotes 指向当前所选区服
+        self.servers = get_price_registry().source_servers(Config.PRICE_SCRAPER.get("servers")) or [DEFAULT_SERVER]
+        self.current_server = self.servers[0]
+        self.server_prices = {server: Config.DEFAULT_PRICES.copy() for server in self.servers}  # 使用默认价格
+        self.server_status = {server: {currency: None for currency in self.currency_names}  # 最近一轮刷新的价格状态
+                              for server in self.servers}
+        self.server_quotes = {server: {} for server in self.servers}  # 最近一轮刷新的报价汇总 {货币: (站点, 汇总)}
+        self.prices = self.server_prices[self.current_server]
+        self.price_status = self.server_status[self.current_server]
+        self.price_quotes = self.server_quotes[self.current_server]
         
         # 初始化UI
         self.init_ui()
         
-        # 启动价格刷新定时器
+        # 启动价格刷新定时器（预热完成后才开始计时）
         self.countdown_timer = QTimer(self)
         self.countdown_timer.timeout.connect(self.update_countdown_display)
+        
+        # 用最近的历史价格预热统计，启动后即可显示涨跌幅（后台读取，读完后在界面线程应用，之后再开始刷新价格，
+        # 避免实时价格先于历史价格写入统计而跳过预热）
+        self._seed_recent_prices()
+    
+    def _start_refreshing(self):
+        """预热线程结束后启动倒计时并开始第一轮价格刷新"""
+        if self.countdown_timer.isActive():
+            return
         self.countdown_timer.start(1000)  # 每秒更新一次倒计时
         
         # 启动价格刷新
@@ -210,6 +706,8 @@ class PriceMonitorTab(QWidget):
         price_grid.setColumnStretch(2, 0)  # 输入框列 - 固定宽度，不拉伸
         price_grid.setColumnStretch(3, 1)  # 价值列
         price_grid.setColumnStretch(4, 3)  # 兑换比例列 - 获得更多空间
+        price_grid.setColumnStretch(5, 1)  # 涨跌幅列
+        price_grid.setColumnStretch(6, 0)  # 下次刷新列
         
         # 神圣石行 - 第1行
         divine_label = QLabel("神圣石:")
@@ -339,6 +837,19 @@ class PriceMonitorTab(QWidget):
         self.chance_exchange_label.setStyleSheet("color: #CCCCCC; font-size: 17px;")
         price_grid.addWidget(self.chance_exchange_label, 3, 4)
         
+        # 各货币的涨跌幅与下次刷新时间
+        for row, currency in enumerate(self.currency_names):
+            trend_label = QLabel("")
+            trend_label.setStyleSheet("color: #CCCCCC; font-size: 14px;")
+            setattr(self, f"{currency}_trend_label", trend_label)
+            price_grid.addWidget(trend_label, row, 5)
+            
+            due_label = QLabel("--:--")
+            due_label.setStyleSheet("color: #888888; font-size: 14px;")
+            due_label.setToolTip("距该货币下次自动刷新的时间")
+            setattr(self, f"{currency}_due_label", due_label)
+            price_grid.addWidget(due_label, row, 6)
+        
         # 添加价格网格到内容布局
         content_layout.addLayout(price_grid)
         
@@ -346,10 +857,19 @@ class PriceMonitorTab(QWidget):
         bottom_layout = QHBoxLayout()
         
         # 添加说明文本
-        price_note = QLabel("说明: 价格数据来自平台，每10分钟自动更新一次。")
+        price_note = QLabel("说明: 价格数据来自平台，各货币按各自的间隔自动更新。")
         price_note.setStyleSheet("color: #888888; margin-top: 10px; font-size: 16px;")  # 增加字体大小
         bottom_layout.addWidget(price_note)
         
+        # 区服选择（只有一个区服时隐藏）
+        self.server_combo = QComboBox()
+        for server in self.servers:
+            self.server_combo.addItem(server_name(server), server)
+        self.server_combo.setStyleSheet("margin-top: 10px; font-size: 14px;")
+        self.server_combo.currentIndexChanged.connect(self.on_server_changed)
+        self.server_combo.setVisible(len(self.servers) > 1)
+        bottom_layout.addWidget(self.server_combo)
+        
         # 添加弹性空间，将倒计时推到右侧
         bottom_layout.addStretch(1)
         
@@ -370,10 +890,17 @@ class PriceMonitorTab(QWidget):
         # 设置最小高度，确保内容不会被过度压缩
         self.setMinimumHeight(250)  # 设置标签页最小高度
     
-    def update_price(self, currency, price):
-        """更新货币价格并重新计算所有比例"""
-        # 更新价格数据
-        self.prices[currency] = price
+    def update_price(self, server, currency, price):
+        """更新货币价格并重新计算所有比例（其他区服的价格只记录，切换到该区服时显示）"""
+        # 更新价格数据，并把本轮价格变化交给调度器（用于调整该货币的刷新间隔）
+        prices = self.server_prices.setdefault(server, Config.DEFAULT_PRICES.copy())
+        self.scheduler.observe(currency, prices.get(currency), price)
+        prices[currency] = price
+        self.ticks.append(server, currency, price)
+        snapshot = self.stats.update(server, currency, price)
+        if server != self.current_server:
+            return
+        self._update_trend_label(currency, snapshot)
         
         # 更新价格显示 - 保持4位小数，并恢复颜色
         price_label = getattr(self, f"{currency}_price_label", None)
@@ -387,23 +914,34 @@ class PriceMonitorTab(QWidget):
         # 重要：直接更新兑换比例，不依赖于calculate_value
         self.update_exchange_rates()
     
-    def refresh_prices(self):
-        """刷新价格数据"""
+    def refresh_prices(self, currencies=None):
+        """刷新价格数据；currencies 为空时刷新全部货币（手动刷新与启动时）"""
+        currencies = list(currencies or self.currency_names)
         try:
             # 检查是否已经有一个刷新线程在运行
             if hasattr(self, 'price_thread') and self.price_thread.isRunning():
                 return
+            # 历史价格尚未预热完成：预热结束后会自动开始第一轮刷新
+            if self.seed_thread.isRunning():
+                return
+            self.scheduler.start(currencies)
+            self.refreshing_currencies = currencies
             
             # 更新UI显示为"正在刷新..."
-            for currency in self.currency_names:
+            for currency in currencies:
                 price_label = getattr(self, f"{currency}_price_label", None)
                 if price_label:
                     price_label.setText("正在刷新...")  # 使用"正在刷新..."而不是"加载中..."
                     price_label.setStyleSheet(f"color: #888888; font-style: italic; font-size: 18px;")  # 使用灰色、斜体并保持字体大小
             
             # 创建新的价格爬取线程
-            self.price_thread = PriceScraper()
+            for quotes in self.server_quotes.values():
+                for currency in currencies:
+                    quotes.pop(currency, None)
+            self.price_thread = PriceScraper(self.servers, currencies)
             self.price_thread.price_updated.connect(self.update_price)
+            self.price_thread.price_status.connect(self.on_price_status)
+            self.price_thread.price_quotes.connect(self.on_price_quotes)
             
             # 添加完成信号处理
             self.price_thread.finished.connect(self.on_price_refresh_finished)
@@ -411,31 +949,39 @@ class PriceMonitorTab(QWidget):
             # 启动线程
             self.price_thread.start()
             
-            # 重置倒计时
-            self.start_time = datetime.now()
-            self.countdown_seconds = 600  # 10分钟
-            
             # 更新倒计时显示
             self.update_countdown_display()
             
         except Exception as e:
-            # 恢复原来的价格显示
+            # 本轮未能启动，这些货币从现在起重新计时，并恢复原来的价格显示
+            self.scheduler.finish(currencies)
+            self.refreshing_currencies = []
             self.update_all_price_displays()
     
     def update_countdown_display(self):
         """更新倒计时显示"""
         try:
-            elapsed_seconds = (datetime.now() - self.start_time).total_seconds()
-            remaining_seconds = max(0, self.countdown_seconds - elapsed_seconds)
-            minutes = int(remaining_seconds // 60)
-            seconds = int(remaining_seconds % 60)
+            # 各货币的下次刷新时间
+            for currency in self.currency_names:
+                due_label = getattr(self, f"{currency}_due_label", None)
+                if due_label:
+                    remaining = self.scheduler.seconds_until(currency)
+                    due_label.setText("刷新中" if remaining is None else
+                                      f"{int(remaining // 60):02d}:{int(remaining % 60):02d}")
             
-            self.countdown_label.setText(f"下次刷新: {minutes:02d}:{seconds:02d}")
+            remaining_seconds = self.scheduler.seconds_until_next()
+            if remaining_seconds is None:
+                self.countdown_label.setText("下次刷新: 刷新中")
+            else:
+                minutes = int(remaining_seconds // 60)
+                seconds = int(remaining_seconds % 60)
+                self.countdown_label.setText(f"下次刷新: {minutes:02d}:{seconds:02d}")
             self.countdown_label.setStyleSheet("color: #888888; margin-top: 10px; font-size: 14px;")
             
-            # 如果倒计时结束，自动刷新价格
-            if remaining_seconds <= 0:
-                self.refresh_prices()
+            # 有货币到期且当前没有刷新在进行时，只刷新到期的货币
+            due = self.scheduler.due()
+            if due and not (hasattr(self, 'price_thread') and self.price_thread.isRunning()):
+                self.refresh_prices(due)
                 
         except:
             self.countdown_label.setText("下次刷新: --:--")
@@ -443,8 +989,12 @@ class PriceMonitorTab(QWidget):
     
     def on_price_refresh_finished(self):
         """价格刷新完成后的处理"""
+        # 按本轮价格变化调整间隔，本轮货币从现在起重新计时
+        refreshed, self.refreshing_currencies = self.refreshing_currencies, []
+        self.scheduler.finish(refreshed)
+        
         # 恢复价格标签的颜色
-        for currency in self.currency_names:
+        for currency in refreshed:
             price_label = getattr(self, f"{currency}_price_label", None)
             if price_label:
                 price_label.setStyleSheet(f"color: {self.currency_colors[currency]}; font-size: 18px;")  # 恢复颜色并设置一致的字体大小
@@ -455,18 +1005,123 @@ class PriceMonitorTab(QWidget):
         # 更新倒计时显示
         self.update_countdown_display()
     
+    def on_price_status(self, server, currency, status):
+        """记录价格状态：本轮未拿到价格但已有旧价格时标记为 stale"""
+        if status == PRICE_FAILED and self.server_prices.get(server, {}).get(currency, 0) > 0:
+            status = PRICE_STALE
+        self.server_status.setdefault(server, {})[currency] = status
+    
+    def on_price_quotes(self, server, currency, site, summary):
+        """记录本轮的报价汇总，在价格标签的提示中显示"""
+        self.server_quotes.setdefault(server, {})[currency] = (site, summary)
+    
+    def on_server_changed(self, index):
+        """切换区服：价格、状态与报价汇总改为显示所选区服的数据"""
+        server = self.server_combo.itemData(index)
+        if not server or server == self.current_server:
+            return
+        self.current_server = server
+        self.prices = self.server_prices.setdefault(server, Config.DEFAULT_PRICES.copy())
+        self.price_status = self.server_status.setdefault(server, {})
+        self.price_quotes = self.server_quotes.setdefault(server, {})
+        self.update_all_price_displays()
+    
+    def _quotes_tooltip(self, currency):
+        entry = self.price_quotes.get(currency)
+        if not entry:
+            return ""
+        site, q = entry
+        text = (f"前 {q['depth']} 条报价（{site}）\n"
+                f"最低 ￥{q['best']:.4f} · 中位 ￥{q['median']:.4f}\n"
+                f"价差 ￥{q['spread']:.4f}（{q['spread_pct']:.1%}）")
+        if q['stock'] is not None:
+            text += f"\n合计库存 {q['stock']}"
+        return text
+    
     def update_all_price_displays(self):
         """更新所有价格显示"""
         for currency in self.currency_names:
             price = self.prices[currency]
             price_label = getattr(self, f"{currency}_price_label", None)
             if price_label:
-                price_label.setText(f"￥{price:.4f}/个")  # 恢复"/个"后缀
-                price_label.setStyleSheet(f"color: {self.currency_colors[currency]}; font-size: 18px;")  # 恢复颜色并设置一致的字体大小
+                status = self.price_status.get(currency)
+                if status == PRICE_FAILED:
+                    price_label.setText("获取失败")
+                    price_label.setStyleSheet("color: #888888; font-size: 18px;")
+                    price_label.setToolTip("本轮刷新未能获取价格")
+                elif status == PRICE_STALE:
+                    price_label.setText(f"￥{price:.4f}/个")
+                    price_label.setStyleSheet("color: #888888; font-size: 18px;")  # 灰色表示沿用上次价格
+                    price_label.setToolTip("本轮刷新未能获取价格，显示的是上次的价格")
+                else:
+                    price_label.setText(f"￥{price:.4f}/个")  # 恢复"/个"后缀
+                    price_label.setStyleSheet(f"color: {self.currency_colors[currency]}; font-size: 18px;")  # 恢复颜色并设置一致的字体大小
+                    price_label.setToolTip(self._quotes_tooltip(currency))
+        
+        self.update_trend_labels()
         
         # 重新计算价值和兑换比例
         self.calculate_value()
     
+    def _seed_recent_prices(self):
+        """在后台线程读取价格历史中最近的价格，结果经 seeded 信号回到界面线程后预热；线程结束后才开始刷新价格"""
+        # 多取一个最长刷新间隔，保证能找到不晚于 24 小时前的锚点
+        span = max(list(self.stats.windows) + [self.stats.extremes_span])
+        self.seed_thread = HistorySeedThread(self.servers, self.currency_names, time.time() - span - 3600, self)
+        self.seed_thread.seeded.connect(self._apply_seed)
+        self.seed_thread.finished.connect(self._start_refreshing)  # 在 seeded 之后送达
+        self.seed_thread.start()
+    
+    def _apply_seed(self, seeded):
+        """用历史价格预热滚动统计与内存价格序列（已有实时数据的不再预热）"""
+        try:
+            for (server, currency), ticks in seeded.items():
+                if self.stats.seed(server, currency, ticks) and not len(self.ticks.ring(currency, server)):
+                    for ts, price in ticks:
+                        self.ticks.append(server, currency, price, ts)
+        except Exception:
+            pass
+        self.update_trend_labels()
+    
+    @staticmethod
+    def _format_change(change):
+        if change is None:
+            return "<span style='color:#888888'>--</span>"
+        if abs(change) < 0.00005:
+            return "<span style='color:#CCCCCC'>0.00%</span>"
+        # 红涨绿跌
+        color, arrow = ("#FF6347", "▲") if change > 0 else ("#32CD32", "▼")
+        return f"<span style='color:{color}'>{arrow}{abs(change):.2%}</span>"
+    
+    def _update_trend_label(self, currency, snapshot):
+        trend_label = getattr(self, f"{currency}_trend_label", None)
+        if not trend_label:
+            return
+        if not snapshot:
+            trend_label.setText("")
+            trend_label.setToolTip("")
+            return
+        changes = snapshot["changes"]
+        trend_label.setText(" ".join(f"{self._format_span(span)} {self._format_change(change)}"
+                                     for span, change in changes.items()))
+        lines = [f"均线（EWMA）￥{snapshot['ewma']:.4f}"]
+        if snapshot["volatility"] is not None:
+            lines.append(f"波动率（逐笔）{snapshot['volatility']:.2%}")
+        if snapshot["low_window"] is not None:
+            lines.append(f"{self._format_span(self.stats.extremes_span)}区间 "
+                         f"￥{snapshot['low_window']:.4f} ~ ￥{snapshot['high_window']:.4f}")
+        lines.append(f"样本 {snapshot['count']} 条")
+        trend_label.setToolTip("\n".join(lines))
+    
+    @staticmethod
+    def _format_span(seconds):
+        return f"{int(seconds // 3600)}h" if seconds >= 3600 else f"{int(seconds // 60)}m"
+    
+    def update_trend_labels(self):
+        """按当前区服更新各货币的涨跌幅"""
+        for currency in self.currency_names:
+            self._update_trend_label(currency, self.stats.snapshot(currency, self.current_server))
+    
     def calculate_value(self):
         """计算货币价值"""
         try:
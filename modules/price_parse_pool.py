@@ -0,0 +1,140 @@
+"""
+价格页面解析进程池
+把 CPU 密集的 HTML 解析放到常驻子进程中执行，避免解析期间与 Qt 事件循环争抢 GIL 导致界面卡顿。
+页面文本送入子进程，只回传 (currency, site, price, quotes) 与解析耗时记录（在主进程中计入 ParseStats）；
+进程池在首次使用时预热并跨刷新周期复用。
+"""
+
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+
+def _init_worker():
+    # 子进程启动时加载注册表（编译全部选择器与正则）及解析依赖，首个页面无需再付出这部分开销
+    from modules.price_registry import get_price_registry
+    import modules.price_sources  # noqa: F401
+    get_price_registry()
+
+
+class _StatsRecorder:
+    """子进程中代替 ParseStats 收集解析耗时记录，随结果回传后在主进程中重放"""
+
+    def __init__(self):
+        self.events = []
+
+    def record(self, *args):
+        self.events.append(('record', args))
+
+    def record_fast(self, *args):
+        self.events.append(('record_fast', args))
+
+
+def _parse_job(currency, site, html, backend, fast_path, quote_depth):
+    from modules.price_sources import parse_page
+    recorder = _StatsRecorder()
+    price, quotes = parse_page(site, html, backend, fast_path, quote_depth, stats=recorder)
+    return currency, site, price, quotes, recorder.events
+
+
+def _warmup():
+    return True
+
+
+class ParsePool:
+    """常驻解析进程池（线程安全）
+
+    - 使用 spawn 方式启动子进程：Windows 上唯一可用的方式，在 Linux 上也避免 fork 带有 Qt 与网络线程的进程
+    - 子进程异常退出时丢弃整个进程池，本次解析回退到当前进程，下次调用时重建
+    """
+
+    def __init__(self, workers=2):
+        self.workers = max(1, int(workers))
+        self._lock = threading.Lock()
+        self._executor = None
+        self._jobs = 0
+        self._failures = 0
+        self._round_trip = 0.0
+
+    def start(self):
+        """创建进程池并预热（不阻塞调用方）"""
+        with self._lock:
+            if self._executor is not None:
+                return
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+            )
+            for _ in range(self.workers):
+                self._executor.submit(_warmup)
+
+    def parse(self, currency, site, html, backend, fast_path, quote_depth=0, timeout=None):
+        """在子进程中解析，返回 (currency, site, price, quotes)；进程池不可用时抛出异常，由调用方回退到本进程解析"""
+        self.start()
+        started = time.perf_counter()
+        try:
+            with self._lock:
+                executor = self._executor
+            future = executor.submit(_parse_job, currency, site, html, backend, fast_path, quote_depth)
+            *result, events = future.result(timeout=timeout)
+        except FuturesTimeoutError:
+            raise
+        except (BrokenProcessPool, RuntimeError, AttributeError):
+            with self._lock:
+                self._failures += 1
+                if self._executor is executor:
+                    self._executor = None
+            try:
+                executor.shutdown(wait=False, cancel_futures=True)
+            except Exception:
+                pass
+            raise
+        with self._lock:
+            self._jobs += 1
+            self._round_trip += time.perf_counter() - started
+        from modules.price_sources import get_parse_stats
+        stats = get_parse_stats()
+        for name, args in events:
+            getattr(stats, name)(*args)
+        return tuple(result)
+
+    def format_stats(self):
+        with self._lock:
+            avg = self._round_trip * 1000 / self._jobs if self._jobs else 0.0
+            return (f"workers={self.workers} jobs={self._jobs} avg_round_trip={avg:.1f}ms "
+                    f"failures={self._failures}")
+
+    def close(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+# 全局实例（跨 PriceScraper 线程与刷新周期共享）
+_parse_pool = None
+_parse_pool_lock = threading.Lock()
+
+
+def get_parse_pool(workers=2):
+    """获取全局解析进程池（首次调用时创建并预热）"""
+    global _parse_pool
+    if _parse_pool is None:
+        with _parse_pool_lock:
+            if _parse_pool is None:
+                _parse_pool = ParsePool(workers)
+                _parse_pool.start()
+    return _parse_pool
+
+
+def close_parse_pool():
+    """关闭全局解析进程池（程序退出时调用）"""
+    global _parse_pool
+    with _parse_pool_lock:
+        if _parse_pool is not None:
+            _parse_pool.close()
+            _parse_pool = None
@@ -0,0 +1,249 @@
+"""
+价格来源注册表
+从 Config.PRICE_SOURCES（及应用数据目录下可选的 price_sources.json 覆盖）加载站点描述：
+URL 模板（按区服与货币参数化）、有序选择器链、正则回退、快速提取规则、多条报价规则与挑战页特征。
+选择器与正则在加载时一次性编译，由所有抓取线程共享，解析热路径上不再编译任何选择器。
+"""
+
+import json
+import os
+import re
+import threading
+from collections import namedtuple
+
+import soupsieve
+
+from modules.config import Config
+
+try:
+    from lxml import etree
+except ImportError:
+    etree = None
+
+
+# xpath 中的 @class~='x' 简写（与 CSS 的 [class~=x] 含义相同）
+_XPATH_CLASS_SHORTHAND = re.compile(r"@class\s*~=\s*'([^']+)'")
+
+TEXT_STRIP = "strip"      # 各文本段去空白后直接拼接（等价于 get_text(strip=True)）
+TEXT_STRINGS = "strings"  # 各文本段去空白后以空格拼接（等价于 ' '.join(stripped_strings)）
+
+DEFAULT_SERVER = "default"
+
+
+class PriceKey(namedtuple('PriceKey', 'server currency')):
+    """价格矩阵中的一格：区服 × 货币"""
+
+    __slots__ = ()
+
+    def __str__(self):
+        return self.currency if self.server == DEFAULT_SERVER else f"{self.server}/{self.currency}"
+
+
+def server_name(server):
+    """区服的显示名称"""
+    return Config.PRICE_SERVERS.get(server, server)
+
+
+def _expand_xpath(xpath):
+    return _XPATH_CLASS_SHORTHAND.sub(
+        lambda m: f"contains(concat(' ', normalize-space(@class), ' '), ' {m.group(1)} ')", xpath)
+
+
+def _class_open_tag(tag, name):
+    """匹配 class 含 name 的 tag 开始标签"""
+    return re.compile(
+        rf'<{tag}\b[^>]*\bclass\s*=\s*["\'][^"\']*(?<![\w-]){re.escape(name)}(?![\w-])[^"\']*["\'][^>]*>', re.I)
+
+
+class SelectorSpec:
+    """选择器链中的一项：css（html.parser 后端）与 xpath（lxml 后端）的预编译结果"""
+
+    __slots__ = ("css", "xpath", "text", "value")
+
+    def __init__(self, spec):
+        self.css = soupsieve.compile(spec["css"]) if spec.get("css") else None
+        self.xpath = etree.XPath(_expand_xpath(spec["xpath"])) if spec.get("xpath") and etree is not None else None
+        self.text = spec.get("text", TEXT_STRIP)
+        if self.text not in (TEXT_STRIP, TEXT_STRINGS):
+            raise ValueError(f"unknown text mode: {self.text}")
+        self.value = re.compile(spec.get("value") or r"(\d+(?:\.\d+)?)")
+
+
+class FastPathSpec:
+    """免建树快速提取规则（见 Config.PRICE_SOURCES 的说明）"""
+
+    __slots__ = ("anchor", "block", "block_tag", "block_class", "index", "element",
+                 "classes", "nth", "contains", "strip_tags", "value")
+
+    def __init__(self, spec):
+        anchor = spec.get("anchor")
+        self.anchor = _class_open_tag(*anchor) if anchor else None
+        self.block_tag, self.block_class = spec["block"]
+        self.block = _class_open_tag(self.block_tag, self.block_class)
+        self.index = int(spec.get("index", 0))
+        element = spec["element"]
+        tag = element["tag"]
+        self.element = re.compile(rf'<{tag}\b([^>]*)>(.*?)</{tag}>', re.S | re.I)
+        self.classes = tuple(element.get("classes") or ())
+        self.nth = int(element.get("nth", 0))
+        self.contains = element.get("contains")
+        self.strip_tags = bool(element.get("text", True))
+        self.value = re.compile(element.get("value") or r"(\d+(?:\.\d+)?)")
+
+
+class QuoteSpec:
+    """多条报价提取规则：row 依次定位每条商品，price 在商品内取单价，stock 为在商品文本中取库存的正则"""
+
+    __slots__ = ("row", "price", "stock")
+
+    def __init__(self, spec):
+        self.row = SelectorSpec(spec["row"])
+        self.price = SelectorSpec(spec["price"])
+        self.stock = re.compile(spec["stock"]) if spec.get("stock") else None
+
+
+class SiteSpec:
+    """单个站点的描述"""
+
+    def __init__(self, name, spec, global_signatures=()):
+        self.name = name
+        self.url = spec["url"]
+        self.items = dict(spec.get("items") or {})
+        # 区服 -> URL 中的区服片段；模板不含 {server} 时只提供默认区服
+        if "{server}" in self.url:
+            self.servers = dict(spec.get("servers") or {})
+        else:
+            self.servers = {DEFAULT_SERVER: ""}
+        self.selectors = tuple(SelectorSpec(s) for s in spec.get("selectors") or ())
+        self.fallback = re.compile(spec["fallback"]) if spec.get("fallback") else None
+        self.fast_path = FastPathSpec(spec["fast_path"]) if spec.get("fast_path") else None
+        self.quotes = QuoteSpec(spec["quotes"]) if spec.get("quotes") else None
+        stream_target = spec.get("stream_target")
+        if stream_target:
+            self.stream_target = (stream_target[0], stream_target[1], int(stream_target[2]))
+        elif self.fast_path is not None:
+            # 快速提取读取的商品块完整出现后，页面剩余部分不再需要
+            self.stream_target = (self.fast_path.block_tag, self.fast_path.block_class, self.fast_path.index + 1)
+        else:
+            self.stream_target = None
+        signatures = list(global_signatures) + list(spec.get("challenge_signatures") or ())
+        self.challenge_signatures = tuple(dict.fromkeys(sig.lower() for sig in signatures if sig))
+
+    def url_for(self, currency, server=DEFAULT_SERVER):
+        item = self.items.get(currency)
+        segment = self.servers.get(server)
+        if item is None or segment is None:
+            return None
+        return self.url.format(item=item, server=segment)
+
+
+class PriceSourceRegistry:
+    """已编译的站点描述集合"""
+
+    def __init__(self, sites, currencies, challenge_signatures=(), errors=(), servers=(DEFAULT_SERVER,)):
+        self._sites = dict(sites)  # 保持站点顺序（即默认尝试顺序）
+        self.currencies = list(currencies)
+        self.servers = list(servers)
+        self.challenge_signatures = tuple(sig.lower() for sig in challenge_signatures if sig)
+        self.errors = list(errors)  # 加载时被跳过的站点及原因，由调用方输出
+
+    def site(self, name):
+        return self._sites.get(name)
+
+    def site_names(self):
+        return list(self._sites)
+
+    def currency_sources(self, server=DEFAULT_SERVER):
+        """{currency: [(site, url), ...]}，按站点顺序排列"""
+        result = {}
+        for currency in self.currencies:
+            sources = []
+            for name, spec in self._sites.items():
+                url = spec.url_for(currency, server)
+                if url:
+                    sources.append((name, url))
+            if sources:
+                result[currency] = sources
+        return result
+
+    def source_servers(self, servers=None):
+        """servers 中注册表已知的区服（保持给定顺序）；servers 为空时返回全部区服"""
+        return [s for s in servers if s in self.servers] if servers else list(self.servers)
+
+    def source_matrix(self, servers=None, currencies=None):
+        """{PriceKey(server, currency): [(site, url), ...]}；servers 为空时包含全部区服，currencies 为空时包含全部货币"""
+        return {PriceKey(server, currency): sources
+                for server in self.source_servers(servers)
+                for currency, sources in self.currency_sources(server).items()
+                if not currencies or currency in currencies}
+
+    def is_challenge(self, html, site=None, limit=8192):
+        """判断页面是否为反爬挑战页（挑战页通常很短，只检查前 limit 个字符）"""
+        spec = self._sites.get(site) if site else None
+        signatures = spec.challenge_signatures if spec is not None else self.challenge_signatures
+        head = (html or '')[:limit].lower()
+        return any(sig in head for sig in signatures)
+
+    def has_listing(self, html, site):
+        """页面中是否已出现站点的列表容器或商品块（按快速提取规则判断；站点未配置时返回 False）"""
+        spec = self._sites.get(site)
+        if spec is None or spec.fast_path is None:
+            return False
+        return any(p.search(html or '') for p in (spec.fast_path.anchor, spec.fast_path.block) if p is not None)
+
+
+def _load_overrides(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def load_registry(sources=None, override_path=None, challenge_signatures=None):
+    """编译站点描述；override_path 指向的 JSON 按站点浅合并（{"site": {...}}，"enabled": false 表示移除该站点）"""
+    merged = {name: dict(spec) for name, spec in (sources if sources is not None else Config.PRICE_SOURCES).items()}
+    if override_path:
+        for name, spec in _load_overrides(override_path).items():
+            if not isinstance(spec, dict):
+                continue
+            merged.setdefault(name, {}).update(spec)
+    signatures = challenge_signatures if challenge_signatures is not None else Config.PRICE_CHALLENGE_SIGNATURES
+
+    sites, errors = {}, []
+    for name, spec in merged.items():
+        if spec.get("enabled", True) is False:
+            continue
+        try:
+            sites[name] = SiteSpec(name, spec, signatures)
+        except Exception as e:
+            errors.append(f"{name}: {str(e).splitlines()[0] if str(e) else type(e).__name__}")
+
+    # 货币顺序：先按 CURRENCY_NAMES，再追加仅在注册表中出现的货币；区服顺序同理按 PRICE_SERVERS
+    currencies = list(Config.CURRENCY_NAMES)
+    servers = [s for s in Config.PRICE_SERVERS if any(s in spec.servers for spec in sites.values())]
+    for spec in sites.values():
+        for currency in spec.items:
+            if currency not in currencies:
+                currencies.append(currency)
+        for server in spec.servers:
+            if server not in servers:
+                servers.append(server)
+    return PriceSourceRegistry(sites, currencies, signatures, errors, servers)
+
+
+# 全局实例
+_price_registry = None
+_price_registry_lock = threading.Lock()
+
+
+def get_price_registry():
+    """获取全局价格来源注册表（首次调用时加载并编译）"""
+    global _price_registry
+    if _price_registry is None:
+        with _price_registry_lock:
+            if _price_registry is None:
+                _price_registry = load_registry(
+                    override_path=os.path.join(Config.get_app_data_dir(), 'price_sources.json'))
+    return _price_registry
@@ -0,0 +1,83 @@
+"""
+价格抓取重试策略
+按来源配置可重试的错误类别与状态码、最大尝试次数，退避采用指数增长 + 全抖动，且不突破刷新截止时间
+"""
+
+import random
+
+import requests
+
+from modules.config import Config
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+
+# 错误类别
+RETRY_CONNECT = "connect"    # 建连失败、连接被重置
+RETRY_TIMEOUT = "timeout"    # 读超时
+RETRY_PROTOCOL = "protocol"  # 响应传输中断、分块/解压错误
+
+
+def classify_error(exc):
+    """把 requests / httpx 的异常归类为重试类别；无法归类返回 None"""
+    if isinstance(exc, requests.exceptions.ConnectTimeout):
+        return RETRY_CONNECT
+    if isinstance(exc, requests.exceptions.Timeout):
+        return RETRY_TIMEOUT
+    if isinstance(exc, requests.exceptions.ConnectionError):
+        return RETRY_CONNECT
+    if isinstance(exc, (requests.exceptions.ChunkedEncodingError, requests.exceptions.ContentDecodingError)):
+        return RETRY_PROTOCOL
+    if httpx is not None:
+        if isinstance(exc, httpx.ConnectTimeout):
+            return RETRY_CONNECT
+        if isinstance(exc, httpx.TimeoutException):
+            return RETRY_TIMEOUT
+        if isinstance(exc, httpx.ConnectError):
+            return RETRY_CONNECT
+        if isinstance(exc, (httpx.RemoteProtocolError, httpx.ReadError, httpx.DecodingError)):
+            return RETRY_PROTOCOL
+    return None
+
+
+class RetryPolicy:
+    """单个来源的重试策略"""
+
+    def __init__(self, max_attempts=2, base_delay=0.3, max_delay=2.0, retry_on=(RETRY_CONNECT, RETRY_PROTOCOL),
+                 retry_statuses=(429, 500, 502, 503, 504), min_budget=1.0):
+        self.max_attempts = max(1, int(max_attempts))
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retry_on = frozenset(retry_on)
+        self.retry_statuses = frozenset(retry_statuses)
+        self.min_budget = min_budget  # 退避后刷新剩余时间至少还要有这么多秒才值得重试
+
+    def retry_reason(self, attempt, exc=None, status=None):
+        """第 attempt 次尝试失败后是否可以重试；可以则返回原因文本，否则返回 None"""
+        if attempt >= self.max_attempts:
+            return None
+        if exc is not None:
+            category = classify_error(exc)
+            return category if category in self.retry_on else None
+        if status is not None and status in self.retry_statuses:
+            return f"HTTP {status}"
+        return None
+
+    def backoff(self, attempt):
+        """全抖动退避：在 [0, min(max_delay, base_delay * 2^(attempt-1))] 内均匀取值"""
+        cap = min(self.max_delay, self.base_delay * (2 ** max(0, attempt - 1)))
+        return random.uniform(0, cap)
+
+    def fits_budget(self, delay, remaining):
+        """remaining 为刷新剩余秒数（None 表示不限）"""
+        return remaining is None or remaining - delay >= self.min_budget
+
+
+def get_retry_policy(site):
+    """按 Config.PRICE_RETRY 构建站点的重试策略（站点配置覆盖 default）"""
+    cfg = dict(Config.PRICE_RETRY.get("default", {}))
+    cfg.update(Config.PRICE_RETRY.get(site, {}))
+    return RetryPolicy(**cfg)
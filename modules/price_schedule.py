@@ -0,0 +1,139 @@
+"""
+价格刷新调度
+每种货币按各自的刷新间隔独立到期（见 Config.PRICE_SCHEDULE），价格页的共享定时器每秒询问哪些货币已到期，
+只抓取到期的货币。配置了上下限时间隔随价格波动自适应：一轮内价格变化超过阈值时缩短间隔，否则逐步放宽。
+"""
+
+import threading
+import time
+
+from modules.config import Config
+
+
+class CurrencySchedule:
+    """单种货币的刷新间隔与下次到期时间（time.monotonic() 时间点）"""
+
+    __slots__ = ("interval", "min_interval", "max_interval", "next_due", "running", "change")
+
+    def __init__(self, interval, min_interval=None, max_interval=None):
+        self.min_interval = float(min_interval if min_interval is not None else interval)
+        self.max_interval = float(max_interval if max_interval is not None else interval)
+        self.interval = min(self.max_interval, max(self.min_interval, float(interval)))
+        self.next_due = 0.0    # 启动时立即到期
+        self.running = False   # 本货币的刷新是否正在进行
+        self.change = None     # 本轮观察到的最大相对变化；None 表示本轮未拿到价格
+
+    @property
+    def adaptive(self):
+        return self.min_interval < self.max_interval
+
+
+class RefreshScheduler:
+    """按货币调度价格刷新（线程安全）
+
+    - due()：已到期且不在刷新中的货币
+    - start(currencies) / finish(currencies)：一轮刷新开始 / 结束；结束时按本轮价格变化调整间隔并安排下次到期
+    - observe(currency, old, new)：记录一次价格更新（多个区服时取本轮最大变化）
+    """
+
+    def __init__(self, config=None, clock=time.monotonic):
+        config = config if config is not None else Config.PRICE_SCHEDULE
+        self.threshold = float(config.get("adapt_threshold", 0.01))  # 相对变化达到该值时视为波动
+        self.shrink = float(config.get("shrink", 0.5))               # 波动时间隔乘以该系数（不低于下限）
+        self.grow = float(config.get("grow", 1.5))                   # 平稳时间隔乘以该系数（不高于上限）
+        self._clock = clock
+        self._config = config
+        self._lock = threading.Lock()
+        self._schedules = {}
+
+    def _schedule(self, currency):
+        schedule = self._schedules.get(currency)
+        if schedule is None:
+            cfg = dict(self._config.get("default", {}))
+            cfg.update(self._config.get(currency, {}))
+            schedule = CurrencySchedule(cfg.get("interval", 600), cfg.get("min"), cfg.get("max"))
+            self._schedules[currency] = schedule
+        return schedule
+
+    def add(self, currencies):
+        """登记需要调度的货币（首次登记时立即到期）"""
+        with self._lock:
+            for currency in currencies:
+                self._schedule(currency)
+
+    def due(self):
+        now = self._clock()
+        with self._lock:
+            return [c for c, s in self._schedules.items() if not s.running and s.next_due <= now]
+
+    def start(self, currencies):
+        with self._lock:
+            for currency in currencies:
+                schedule = self._schedule(currency)
+                schedule.running = True
+                schedule.change = None
+
+    def observe(self, currency, old, new):
+        if old is None or old <= 0 or new <= 0:
+            return  # 没有上一轮价格（首轮）时无从比较，不参与本轮间隔调整
+        change = abs(new - old) / old
+        with self._lock:
+            schedule = self._schedule(currency)
+            schedule.change = change if schedule.change is None else max(schedule.change, change)
+
+    def finish(self, currencies):
+        """一轮刷新结束：本轮拿到价格的货币按变化调整间隔，所有货币从现在起重新计时"""
+        now = self._clock()
+        with self._lock:
+            for currency in currencies:
+                schedule = self._schedule(currency)
+                if schedule.adaptive and schedule.change is not None:
+                    factor = self.shrink if schedule.change >= self.threshold else self.grow
+                    schedule.interval = min(schedule.max_interval,
+                                            max(schedule.min_interval, schedule.interval * factor))
+                schedule.running = False
+                schedule.next_due = now + schedule.interval
+
+    def seconds_until(self, currency):
+        """距下次到期的秒数；正在刷新时返回 None"""
+        with self._lock:
+            schedule = self._schedules.get(currency)
+            if schedule is None or schedule.running:
+                return None
+            return max(0.0, schedule.next_due - self._clock())
+
+    def seconds_until_next(self):
+        """距最近一次到期的秒数；全部在刷新中时返回 None"""
+        now = self._clock()
+        with self._lock:
+            pending = [s.next_due for s in self._schedules.values() if not s.running]
+        return max(0.0, min(pending) - now) if pending else None
+
+    def interval(self, currency):
+        with self._lock:
+            return self._schedule(currency).interval
+
+    def format_stats(self):
+        with self._lock:
+            items = list(self._schedules.items())
+        now = self._clock()
+        parts = []
+        for currency, s in items:
+            nxt = 'running' if s.running else f"{max(0.0, s.next_due - now):.0f}s"
+            parts.append(f"{currency}(interval={s.interval:.0f}s next={nxt})")
+        return ' '.join(parts) or 'empty'
+
+
+# 全局实例（价格页的定时器驱动，其他组件可查询各货币的刷新间隔与下次到期时间）
+_refresh_scheduler = None
+_refresh_scheduler_lock = threading.Lock()
+
+
+def get_refresh_scheduler():
+    """获取全局刷新调度器（首次调用时按 Config.PRICE_SCHEDULE 创建）"""
+    global _refresh_scheduler
+    if _refresh_scheduler is None:
+        with _refresh_scheduler_lock:
+            if _refresh_scheduler is None:
+                _refresh_scheduler = RefreshScheduler()
+    return _refresh_scheduler
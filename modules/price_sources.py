@@ -1,70 +1,386 @@
 """
-站点解析器（分站点维护，避免后期改动混乱）
+站点解析器（站点描述见 modules/price_registry.py 与 Config.PRICE_SOURCES）
 
-提供每个站点的价格解析函数：传入 BeautifulSoup 对象与原始 HTML，返回 float 价格，失败返回 0.0。
+按注册表中预编译的选择器链解析价格：传入站点名与原始 HTML，返回 float 价格，失败返回 0.0。
+支持两种建树后端（lxml + XPath / BeautifulSoup html.parser + CSS），以及建树前的免建树快速提取；
+parse_page() 在同一次建树中额外提取前 N 条报价 ((单价, 库存或 None), ...)。
 """
 
 import re
-from bs4 import BeautifulSoup  # 仅用于类型注释/补全，调用方已传 soup
+import threading
+import time
+from bs4 import BeautifulSoup
 
+from modules.price_registry import get_price_registry, TEXT_STRINGS
 
-def parse_dd373(soup: BeautifulSoup, html: str) -> float:
-    """解析 DD373 的第二条商品价格。
+try:
+    import lxml.html
+except ImportError:
+    lxml = None
 
-    说明：该站常见 JS 挑战页，若返回挑战页将无法命中选择器，直接返回 0.0。
+
+def is_challenge_page(html: str, site: str = None, limit: int = 8192) -> bool:
+    """判断页面是否为反爬挑战页（全局特征 + 站点额外特征，只检查前 limit 个字符）"""
+    return get_price_registry().is_challenge(html, site, limit)
+
+
+def is_challenge_head(raw: bytes, site: str = None, encoding: str = None, limit: int = 8192) -> bool:
+    """在响应体开头 limit 字节上判断是否为挑战页（下载途中使用，命中即中止下载）
+
+    正常列表页的脚本中也可能出现通用特征（如 captcha），因此只有命中特征且开头中没有站点的列表容器 / 商品块时才视为挑战页。
+    响应头未声明编码时按 utf-8 解码。
     """
+    head = bytes(raw[:limit])
     try:
-        el = soup.select_one('div.good-list-box div:nth-child(2) div.p-r66 p.font12.color666.m-t5')
-        if not el:
-            return 0.0
-        text = el.get_text(strip=True)
-        m = re.search(r'(\d+(?:\.\d+)?)', text)
-        return float(m.group(1)) if m else 0.0
-    except Exception:
-        return 0.0
+        text = head.decode(encoding or 'utf-8', errors='replace')
+    except LookupError:
+        text = head.decode('utf-8', errors='replace')
+    return is_challenge_page(text, site, limit) and not get_price_registry().has_listing(text, site)
+
+
+class ChallengeStats:
+    """按站点累计命中挑战页的次数、其中下载途中中止的次数与已读取的字节数（线程安全）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._totals = {}
+
+    def record(self, site, aborted, bytes_read):
+        with self._lock:
+            entry = self._totals.setdefault(site, [0, 0, 0])
+            entry[0] += 1
+            entry[1] += 1 if aborted else 0
+            entry[2] += bytes_read
 
+    def counts(self):
+        """返回 {site: 命中次数}"""
+        with self._lock:
+            return {site: entry[0] for site, entry in self._totals.items()}
 
-def parse_7881(soup: BeautifulSoup, html: str) -> float:
-    """解析 7881 的第二条商品单价（元/个）。
+    def format_stats(self):
+        with self._lock:
+            items = sorted(self._totals.items())
+        return ' '.join(f"{site}(n={n} aborted={aborted} avg_read={read / n / 1024:.1f}KB)"
+                        for site, (n, aborted, read) in items) or 'none'
 
-    结构示例：
-    <div class="price-unit">
-      <p><em>1</em>元=<em>1.587</em>个</p>
-      <p><em>0.6300</em>元/个</p>
-    </div>
+
+_challenge_stats = ChallengeStats()
+
+
+def get_challenge_stats():
+    return _challenge_stats
+
+
+def stream_target(site: str, quote_depth: int = 0):
+    """流式读取的提前终止条件 (标签, class, 需闭合的个数)；站点未配置时返回 None
+
+    需要多条报价时至少等到 quote_depth 个商品块闭合（商品块不足时读完整页）。
     """
+    spec = get_price_registry().site(site)
+    if spec is None or spec.stream_target is None:
+        return None
+    tag, cls, count = spec.stream_target
+    if quote_depth > 0 and spec.quotes is not None:
+        count = max(count, quote_depth)
+    return tag, cls, count
+
+
+PARSE_BACKEND_LXML = 'lxml'
+PARSE_BACKEND_HTML_PARSER = 'html.parser'
+
+
+def lxml_available() -> bool:
+    return lxml is not None
+
+
+def _build_lxml_tree(html: str):
     try:
-        el = (
-            soup.select_one('div.list-box > div:nth-of-type(2) div.price-unit p:nth-of-type(2) em')
-            or soup.select_one('div.price-unit p:nth-of-type(2) em')
-            or soup.select_one('div.list-box div.price-unit p:nth-of-type(2) em')
-        )
-        if el:
-            text = el.get_text(strip=True)
-            m = re.search(r'(\d+(?:\.\d+)?)', text)
-            if m:
-                return float(m.group(1))
-        # 回退：直接在页面文本中找 “x.xx元/个”
-        m2 = re.search(r'(\d+(?:\.\d+)?)\s*元/个', html)
-        return float(m2.group(1)) if m2 else 0.0
+        return lxml.html.document_fromstring(html)
+    except ValueError:
+        # 带 XML 编码声明的 str 无法直接解析，去掉声明后重试
+        return lxml.html.document_fromstring(re.sub(r'^\s*<\?xml[^>]*\?>', '', html, count=1))
+
+
+def _lxml_text(el, mode) -> str:
+    if mode == TEXT_STRINGS:
+        return ' '.join(s.strip() for s in el.itertext() if s.strip())
+    return ''.join(s.strip() for s in el.itertext())
+
+
+def _soup_text(el, mode) -> str:
+    if mode == TEXT_STRINGS:
+        return ' '.join(el.stripped_strings)
+    return el.get_text(strip=True)
+
+
+def _select_price(spec, html: str, find, text_of) -> float:
+    """依次尝试选择器链，首个取到价格的选择器生效；均失败时在整页上匹配 fallback 正则"""
+    for selector in spec.selectors:
+        el = find(selector)
+        if el is None:
+            continue
+        m = selector.value.search(text_of(el, selector.text))
+        if m:
+            return float(m.group(1))
+    if spec.fallback is not None:
+        m = spec.fallback.search(html)
+        if m:
+            return float(m.group(1))
+    return 0.0
+
+
+def parse_soup(spec, soup: BeautifulSoup, html: str) -> float:
+    """html.parser 后端：使用预编译的 CSS 选择器"""
+    def find(selector):
+        return selector.css.select_one(soup) if selector.css is not None else None
+    try:
+        return _select_price(spec, html, find, _soup_text)
     except Exception:
         return 0.0
 
 
-def parse_uu898(soup: BeautifulSoup, html: str) -> float:
-    """解析 UU898 的首条商品单价（元/个）。
+def parse_lxml(spec, tree, html: str) -> float:
+    """lxml 后端：使用预编译的 XPath（取文档顺序第一个匹配，等价于 select_one）"""
+    def find(selector):
+        if selector.xpath is None:
+            return None
+        found = selector.xpath(tree)
+        return found[0] if found else None
+    try:
+        return _select_price(spec, html, find, _lxml_text)
+    except Exception:
+        return 0.0
 
-    策略：
-    - 首选首条商品块 li.sp_li1 h6 的文本，用正则提取 “x.xx元/个”
-    - 失败则在整页回退正则提取（避免命中 “1元=…” 结构）
-    """
+
+# ---------------- 多条报价 ----------------
+
+def _collect_quotes(quote_spec, rows, find_price, text_of, depth):
+    quotes = []
+    for row in rows:
+        el = find_price(row)
+        if el is None:
+            continue
+        m = quote_spec.price.value.search(text_of(el, quote_spec.price.text))
+        if not m:
+            continue
+        price = float(m.group(1))
+        if price <= 0:
+            continue
+        stock = None
+        if quote_spec.stock is not None:
+            s = quote_spec.stock.search(text_of(row, TEXT_STRINGS))
+            if s:
+                stock = int(s.group(1).replace(',', ''))
+        quotes.append((price, stock))
+        if len(quotes) >= depth:
+            break
+    return tuple(quotes)
+
+
+def quotes_lxml(spec, tree, depth: int) -> tuple:
+    q = spec.quotes
+    if q is None or q.row.xpath is None or q.price.xpath is None:
+        return ()
+
+    def find_price(row):
+        found = q.price.xpath(row)
+        return found[0] if found else None
+    try:
+        return _collect_quotes(q, q.row.xpath(tree), find_price, _lxml_text, depth)
+    except Exception:
+        return ()
+
+
+def quotes_soup(spec, soup: BeautifulSoup, depth: int) -> tuple:
+    q = spec.quotes
+    if q is None or q.row.css is None or q.price.css is None:
+        return ()
     try:
-        blk = soup.select_one('li.sp_li1 h6')
-        text_src = ' '.join(blk.stripped_strings) if blk else ''
-        m = re.search(r'(\d+(?:\.\d+)?)\s*元/个', text_src)
+        return _collect_quotes(q, q.row.css.select(soup), q.price.css.select_one, _soup_text, depth)
+    except Exception:
+        return ()
+
+
+def summarize_quotes(quotes):
+    """由报价数组计算 {depth, best, median, spread, spread_pct, stock}；空数组返回 None"""
+    prices = sorted(p for p, _ in quotes)
+    if not prices:
+        return None
+    n = len(prices)
+    mid = n // 2
+    median = prices[mid] if n % 2 else (prices[mid - 1] + prices[mid]) / 2
+    spread = prices[-1] - prices[0]
+    stocks = [s for _, s in quotes if s is not None]
+    return {
+        "depth": n,
+        "best": prices[0],
+        "median": median,
+        "spread": spread,
+        "spread_pct": spread / median if median else 0.0,
+        "stock": sum(stocks) if stocks else None,
+    }
+
+
+# ---------------- 免建树快速提取 ----------------
+# 在原始 HTML 上用锚定到列表结构的预编译正则直接定位商品块；只有结果明确时才返回价格，
+# 否则返回 None 交给 DOM 解析。每个商品块取“本块到下一个同类块”之间的片段（最长 8KB）。
+
+_FP_SEGMENT_MAX = 8192
+_FP_TAGS = re.compile(r'<[^>]+>')
+_FP_CLASS_ATTR = re.compile(r'\bclass\s*=\s*["\']([^"\']*)["\']', re.I)
+
+
+def _fp_segment(html: str, block_re, index: int, start: int = 0):
+    """返回 start 之后第 index 个（从 0 计）商品块的片段；块不足时返回 None"""
+    current = None
+    for i, m in enumerate(block_re.finditer(html, start)):
+        if i == index:
+            current = m
+        elif i == index + 1:
+            return html[current.end():min(m.start(), current.end() + _FP_SEGMENT_MAX)]
+    if current is None:
+        return None
+    return html[current.end():current.end() + _FP_SEGMENT_MAX]
+
+
+def _fp_extract(fp, html: str):
+    start = 0
+    if fp.anchor is not None:
+        m = fp.anchor.search(html)
         if not m:
-            m = re.search(r'(\d+(?:\.\d+)?)\s*元/个', html)
-        return float(m.group(1)) if m else 0.0
+            return None
+        start = m.end()
+    seg = _fp_segment(html, fp.block, fp.index, start)
+    if seg is None:
+        return None
+    candidates = []
+    for m in fp.element.finditer(seg):
+        if fp.classes:
+            cls = _FP_CLASS_ATTR.search(m.group(1))
+            classes = cls.group(1).split() if cls else ()
+            if not all(c in classes for c in fp.classes):
+                continue
+        candidates.append(m.group(2))
+        if len(candidates) > fp.nth:
+            break
+    if len(candidates) <= fp.nth:
+        return None
+    inner = candidates[fp.nth]
+    if fp.contains and fp.contains not in inner:
+        return None
+    if fp.strip_tags:
+        inner = ' '.join(_FP_TAGS.sub(' ', inner).split())
+    m = fp.value.search(inner)
+    return float(m.group(1)) if m else None
+
+
+def fast_extract(site: str, html: str):
+    """免建树提取价格；结果不明确（块缺失、结构不符）时返回 None"""
+    spec = get_price_registry().site(site)
+    if spec is None or spec.fast_path is None or not html:
+        return None
+    try:
+        price = _fp_extract(spec.fast_path, html)
     except Exception:
-        return 0.0
+        return None
+    return price if price and price > 0 else None
+
+
+class ParseStats:
+    """按站点、后端累计解析次数与耗时，以及快速提取的命中率与节省的时间（线程安全）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._totals = {}
+        self._fast = {}
+
+    def record(self, site, backend, seconds, size=0):
+        with self._lock:
+            entry = self._totals.setdefault((site, backend), [0, 0.0, 0])
+            entry[0] += 1
+            entry[1] += seconds
+            entry[2] += size
+
+    def _dom_cost_per_byte(self, site, backend):
+        entry = self._totals.get((site, backend))
+        return entry[1] / entry[2] if entry and entry[2] else None
+
+    def record_fast(self, site, hit, seconds, size=0, backend=PARSE_BACKEND_LXML):
+        """命中时节省的时间按该站点、该后端 DOM 解析的每字节平均耗时 × 页面大小估算（尚无 DOM 样本时不计）；
+        未命中时快速提取本身的耗时计为额外开销"""
+        with self._lock:
+            entry = self._fast.setdefault(site, [0, 0, 0.0])
+            if hit:
+                entry[0] += 1
+                cost = self._dom_cost_per_byte(site, backend)
+                if cost is not None:
+                    entry[2] += cost * size - seconds
+            else:
+                entry[1] += 1
+                entry[2] -= seconds
+
+    def stats(self):
+        """返回 {(site, backend): {count, total_ms, avg_ms}}"""
+        with self._lock:
+            items = list(self._totals.items())
+        return {key: {"count": n, "total_ms": t * 1000, "avg_ms": t * 1000 / n} for key, (n, t, _size) in items}
+
+    def format_stats(self):
+        parts = [f"{site}/{backend}(n={s['count']} avg={s['avg_ms']:.2f}ms)"
+                 for (site, backend), s in sorted(self.stats().items())]
+        with self._lock:
+            fast = sorted(self._fast.items())
+        for site, (hits, misses, saved) in fast:
+            parts.append(f"{site}/fast(hit={hits}/{hits + misses} saved={saved * 1000:.1f}ms)")
+        return ' '.join(parts) or 'no parses'
+
+
+_parse_stats = ParseStats()
+
+
+def get_parse_stats():
+    return _parse_stats
+
+
+def parse_page(site: str, html: str, backend: str = PARSE_BACKEND_LXML, fast_path: bool = True,
+               quote_depth: int = 0, stats=None):
+    """解析站点页面，返回 (price, quotes)
+
+    - price：先尝试免建树快速提取（仅在不需要报价时），不明确时按指定后端建树解析；
+      lxml 不可用或建树失败时回退到 html.parser。未知站点返回 (0.0, ())
+    - quotes：quote_depth > 0 时在同一棵树上提取前 quote_depth 条报价，否则为空
+    - stats：记录解析耗时的对象（record / record_fast 接口），默认为全局 ParseStats
+    """
+    stats = stats if stats is not None else _parse_stats
+    spec = get_price_registry().site(site)
+    if spec is None:
+        return 0.0, ()
+    want_quotes = quote_depth > 0 and spec.quotes is not None
+    if fast_path and spec.fast_path is not None and not want_quotes:
+        started = time.perf_counter()
+        price = fast_extract(site, html)
+        dom_backend = backend if backend == PARSE_BACKEND_LXML and lxml is not None else PARSE_BACKEND_HTML_PARSER
+        stats.record_fast(site, price is not None, time.perf_counter() - started, len(html), dom_backend)
+        if price is not None:
+            return price, ()
+    started = time.perf_counter()
+    if backend == PARSE_BACKEND_LXML and lxml is not None:
+        try:
+            tree = _build_lxml_tree(html)
+        except Exception:
+            tree = None
+        if tree is not None:
+            price = parse_lxml(spec, tree, html)
+            quotes = quotes_lxml(spec, tree, quote_depth) if want_quotes else ()
+            stats.record(site, PARSE_BACKEND_LXML, time.perf_counter() - started, len(html))
+            return price, quotes
+    soup = BeautifulSoup(html, 'html.parser')
+    price = parse_soup(spec, soup, html)
+    quotes = quotes_soup(spec, soup, quote_depth) if want_quotes else ()
+    stats.record(site, PARSE_BACKEND_HTML_PARSER, time.perf_counter() - started, len(html))
+    return price, quotes
+
 
+def parse_price(site: str, html: str, backend: str = PARSE_BACKEND_LXML, fast_path: bool = True) -> float:
+    """只解析单个价格（见 parse_page）"""
+    return parse_page(site, html, backend, fast_path)[0]
@@ -0,0 +1,212 @@
+"""
+价格滚动统计
+每个 区服×货币 维护一组流式统计，每条新价格 O(1)（窗口类统计为均摊 O(1)）更新，无需扫描历史数据：
+  - EWMA 均线：按时间间隔折算权重（半衰期见 Config.PRICE_STATS），适应不规则的刷新间隔
+  - 波动率：Welford 算法累计的逐笔收益率标准差
+  - 最低 / 最高价：全程与最近 24 小时（单调队列）
+  - 相对 1 小时 / 24 小时前的涨跌幅：每个时间窗口保留一条不晚于窗口起点的锚点
+价格页显示这些指标，其他组件（提醒、接口、自适应调度等）通过 get_price_stats().snapshot() 读取同一份数据。
+"""
+
+import math
+import threading
+import time
+from collections import deque
+
+from modules.config import Config
+from modules.price_registry import DEFAULT_SERVER, PriceKey
+
+
+class _Window:
+    """最近 span 秒内的价格，外加一条不晚于窗口起点的锚点（用于计算相对窗口起点的涨跌幅）"""
+
+    __slots__ = ("span", "_ticks")
+
+    def __init__(self, span):
+        self.span = float(span)
+        self._ticks = deque()
+
+    def push(self, ts, price):
+        ticks = self._ticks
+        ticks.append((ts, price))
+        horizon = ts - self.span
+        while len(ticks) >= 2 and ticks[1][0] <= horizon:
+            ticks.popleft()
+
+    def anchor(self, now):
+        """不晚于 now - span 的最后一条价格；历史不足一个窗口时返回 None"""
+        if self._ticks and self._ticks[0][0] <= now - self.span:
+            return self._ticks[0][1]
+        return None
+
+
+class _Extremes:
+    """最近 span 秒内的最低价与最高价（单调队列，均摊 O(1)）"""
+
+    __slots__ = ("span", "_min", "_max")
+
+    def __init__(self, span):
+        self.span = float(span)
+        self._min = deque()
+        self._max = deque()
+
+    def push(self, ts, price):
+        while self._min and self._min[-1][1] >= price:
+            self._min.pop()
+        self._min.append((ts, price))
+        while self._max and self._max[-1][1] <= price:
+            self._max.pop()
+        self._max.append((ts, price))
+        horizon = ts - self.span
+        while self._min[0][0] < horizon:
+            self._min.popleft()
+        while self._max[0][0] < horizon:
+            self._max.popleft()
+
+    @property
+    def low(self):
+        return self._min[0][1] if self._min else None
+
+    @property
+    def high(self):
+        return self._max[0][1] if self._max else None
+
+
+class RollingStats:
+    """单个 区服×货币 的流式统计（不加锁，由 PriceStats 串行化）"""
+
+    __slots__ = ("half_life", "count", "price", "ts", "ewma", "low", "high",
+                 "_returns", "_mean", "_m2", "_windows", "_extremes")
+
+    def __init__(self, half_life=3600, windows=(3600, 86400), extremes_span=86400):
+        self.half_life = float(half_life)
+        self.count = 0
+        self.price = None
+        self.ts = None
+        self.ewma = None
+        self.low = None
+        self.high = None
+        self._returns = 0    # Welford：收益率样本数、均值与离差平方和
+        self._mean = 0.0
+        self._m2 = 0.0
+        self._windows = {int(span): _Window(span) for span in windows}
+        self._extremes = _Extremes(extremes_span)
+
+    def update(self, price, ts):
+        if self.ts is not None and ts < self.ts:
+            ts = self.ts
+        if self.price is None:
+            self.ewma = price
+            self.low = self.high = price
+        else:
+            alpha = 1.0 - 0.5 ** ((ts - self.ts) / self.half_life) if self.half_life > 0 else 1.0
+            self.ewma += alpha * (price - self.ewma)
+            self.low = min(self.low, price)
+            self.high = max(self.high, price)
+            r = price / self.price - 1.0
+            self._returns += 1
+            delta = r - self._mean
+            self._mean += delta / self._returns
+            self._m2 += delta * (r - self._mean)
+        self.count += 1
+        self.price = price
+        self.ts = ts
+        for window in self._windows.values():
+            window.push(ts, price)
+        self._extremes.push(ts, price)
+
+    @property
+    def volatility(self):
+        """逐笔收益率的样本标准差；样本不足时返回 None"""
+        if self._returns < 2:
+            return None
+        return math.sqrt(self._m2 / (self._returns - 1))
+
+    def change(self, span):
+        """相对 span 秒前价格的涨跌幅（如 0.012 表示上涨 1.2%）；未跟踪该窗口或历史不足时返回 None"""
+        window = self._windows.get(int(span))
+        if window is None or self.price is None:
+            return None
+        anchor = window.anchor(self.ts)
+        return self.price / anchor - 1.0 if anchor else None
+
+    def snapshot(self):
+        return {
+            "price": self.price,
+            "ts": self.ts,
+            "count": self.count,
+            "ewma": self.ewma,
+            "volatility": self.volatility,
+            "low": self.low,
+            "high": self.high,
+            "low_window": self._extremes.low,
+            "high_window": self._extremes.high,
+            "changes": {span: self.change(span) for span in self._windows},
+        }
+
+
+class PriceStats:
+    """区服×货币 -> RollingStats（线程安全）"""
+
+    def __init__(self, config=None):
+        config = config if config is not None else Config.PRICE_STATS
+        self.half_life = float(config.get("ewma_half_life", 3600))
+        self.windows = tuple(int(s) for s in config.get("change_windows", (3600, 86400)))
+        self.extremes_span = float(config.get("extremes_window", 86400))
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def _get(self, server, currency):
+        key = PriceKey(server, currency)
+        stats = self._stats.get(key)
+        if stats is None:
+            stats = self._stats[key] = RollingStats(self.half_life, self.windows, self.extremes_span)
+        return stats
+
+    def update(self, server, currency, price, ts=None):
+        """记录一条新价格，返回更新后的快照"""
+        if price <= 0:
+            return self.snapshot(currency, server)
+        with self._lock:
+            stats = self._get(server, currency)
+            stats.update(float(price), time.time() if ts is None else float(ts))
+            return stats.snapshot()
+
+    def seed(self, server, currency, ticks):
+        """用历史价格 [(ts, price)]（按时间升序）预热；已有实时数据时不再预热，返回是否已预热"""
+        with self._lock:
+            stats = self._get(server, currency)
+            if stats.count:
+                return False
+            for ts, price in ticks:
+                if price > 0:
+                    stats.update(float(price), float(ts))
+            return True
+
+    def snapshot(self, currency, server=DEFAULT_SERVER):
+        """当前统计快照；尚无数据时返回 None"""
+        with self._lock:
+            stats = self._stats.get(PriceKey(server, currency))
+            return stats.snapshot() if stats is not None and stats.count else None
+
+    def format_stats(self):
+        with self._lock:
+            items = [(key, s.count, s.volatility) for key, s in self._stats.items()]
+        parts = [f"{key}(n={count} vol={vol:.2%})" if vol is not None else f"{key}(n={count})"
+                 for key, count, vol in items]
+        return ' '.join(parts) or 'empty'
+
+
+# 全局实例（价格页写入，提醒、接口、调度等组件读取）
+_price_stats = None
+_price_stats_lock = threading.Lock()
+
+
+def get_price_stats():
+    """获取全局价格滚动统计（参数见 Config.PRICE_STATS）"""
+    global _price_stats
+    if _price_stats is None:
+        with _price_stats_lock:
+            if _price_stats is None:
+                _price_stats = PriceStats()
+    return _price_stats
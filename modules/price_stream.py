@@ -0,0 +1,141 @@
+"""
+流式页面读取
+按块下载响应体并送入增量 HTML 分词器，站点解析所需的商品块一旦完整出现即停止下载
+"""
+
+import codecs
+import time
+from html.parser import HTMLParser
+
+from modules.charset_resolver import get_charset_resolver
+
+
+class TargetWatcher(HTMLParser):
+    """增量分词器：统计 class 含 css_class 的 tag 元素已闭合的个数，达到 needed 即视为目标已捕获"""
+
+    def __init__(self, tag, css_class, needed=1):
+        super().__init__(convert_charrefs=False)
+        self.tag = tag
+        self.css_class = css_class
+        self.needed = needed
+        self.closed = 0
+        self._stack = []  # 同名 tag 的打开栈，记录每层是否为目标元素
+
+    @property
+    def done(self):
+        return self.closed >= self.needed
+
+    def handle_starttag(self, tag, attrs):
+        if tag != self.tag:
+            return
+        classes = ''
+        for name, value in attrs:
+            if name == 'class' and value:
+                classes = value
+                break
+        self._stack.append(self.css_class in classes.split())
+
+    def handle_endtag(self, tag):
+        if tag != self.tag or not self._stack:
+            return
+        if self._stack.pop():
+            self.closed += 1
+
+
+def _header_encoding(resp):
+    enc = (getattr(resp, 'encoding', None) or '').lower()
+    return None if not enc or enc == 'iso-8859-1' else enc
+
+
+class StreamingPage:
+    """以流式方式读取的响应体
+
+    - read_until(watcher)：边读边分词，目标捕获、达到字节上限、cancel_event 置位或超过 deadline 时停止
+    - read_rest()：解析前缀失败时继续读完剩余部分（仍受字节上限约束）
+    - challenge(raw, encoding) 在前 sniff_bytes 字节上返回 True 时视为挑战页，置位 challenged 并停止下载
+    - 提前停止会丢弃该连接（未读完的连接无法复用），因此该模式默认关闭
+    """
+
+    def __init__(self, resp, byte_cap=0, chunk_size=16384, cancel_event=None, deadline=None,
+                 challenge=None, sniff_bytes=8192):
+        self.resp = resp
+        self.byte_cap = byte_cap
+        self.chunk_size = chunk_size
+        self.cancel_event = cancel_event
+        self.deadline = deadline  # time.monotonic() 时间点
+        self.challenge = challenge
+        self.sniff_bytes = sniff_bytes
+        self._chunks = resp.iter_content(chunk_size=chunk_size)
+        self._buf = bytearray()
+        self.exhausted = False
+        self.capped = False
+        self.stopped_early = False
+        self.cancelled = False
+        self.challenged = False
+
+    @property
+    def bytes_read(self):
+        return len(self._buf)
+
+    @property
+    def raw(self):
+        return bytes(self._buf)
+
+    def _next_chunk(self):
+        if self.exhausted or self.capped or self.challenged:
+            return None
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            self.cancelled = True
+            return None
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            self.cancelled = True
+            return None
+        try:
+            chunk = next(self._chunks)
+        except StopIteration:
+            self.exhausted = True
+            return None
+        if self.byte_cap and len(self._buf) + len(chunk) >= self.byte_cap:
+            chunk = chunk[:max(0, self.byte_cap - len(self._buf))]
+            self.capped = True
+        sniffing = self.challenge is not None and len(self._buf) < self.sniff_bytes
+        self._buf += chunk
+        if sniffing and self.challenge(self._buf[:self.sniff_bytes], _header_encoding(self.resp)):
+            self.challenged = True
+            return None
+        return chunk
+
+    def read_until(self, watcher):
+        decoder = codecs.getincrementaldecoder(_lookup(_header_encoding(self.resp)))(errors='replace')
+        while True:
+            chunk = self._next_chunk()
+            if chunk is None:
+                break
+            watcher.feed(decoder.decode(chunk))
+            if watcher.done:
+                self.stopped_early = True
+                break
+        return self.raw
+
+    def read_rest(self):
+        while self._next_chunk() is not None:
+            pass
+        return self.raw
+
+    def text(self):
+        """解码已读取的字节（字符集由 CharsetResolver 按响应头 / BOM / <meta charset> / 主机缓存确定）"""
+        return get_charset_resolver().decode(str(getattr(self.resp, 'url', '')),
+                                             self.resp.headers.get('Content-Type'), self.raw)
+
+    def close(self):
+        try:
+            self.resp.close()
+        except Exception:
+            pass
+
+
+def _lookup(enc):
+    try:
+        return codecs.lookup(enc or 'utf-8').name
+    except LookupError:
+        return 'utf-8'
@@ -0,0 +1,160 @@
+"""
+内存价格序列
+每个 区服×货币 一个定长环形缓冲区，时间戳与价格分别存放在预分配的 array('d') 中（每条 16 字节，无逐条对象开销），
+追加 O(1)，按时间用 bisect 定位，区间以 memoryview 零拷贝返回。供图表与统计读取最近的价格，更早的数据见价格历史。
+"""
+
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+
+from modules.config import Config
+from modules.price_registry import DEFAULT_SERVER, PriceKey
+
+
+class TickRing:
+    """定长价格环形缓冲区（单写多读；写入由调用方串行化）
+
+    时间戳需单调不减（追加时早于最新一条的时间戳按最新时间戳记录）。缓冲区写满后覆盖最旧的一条。
+    物理上数据最多分成两段（环的尾部与头部），views() 按时间顺序返回这一至两段的 memoryview。
+    """
+
+    __slots__ = ("capacity", "_ts", "_prices", "_start", "_size", "_next", "_last_ts")
+
+    def __init__(self, capacity=4096):
+        self.capacity = max(1, int(capacity))
+        self._ts = array('d', bytes(8 * self.capacity))
+        self._prices = array('d', bytes(8 * self.capacity))
+        self._start = 0  # 最旧一条的物理位置
+        self._size = 0
+        self._next = 0   # 下一条写入的物理位置
+        self._last_ts = float('-inf')
+
+    def __len__(self):
+        return self._size
+
+    def append(self, price, ts=None):
+        ts = time.time() if ts is None else float(ts)
+        if ts < self._last_ts:
+            ts = self._last_ts
+        pos = self._next
+        self._ts[pos] = ts
+        self._prices[pos] = price
+        self._last_ts = ts
+        self._next = pos + 1 if pos + 1 < self.capacity else 0
+        if self._size < self.capacity:
+            self._size += 1
+        else:
+            self._start = self._next
+
+    def _segments(self):
+        """按时间顺序的物理区间 [(lo, hi)]"""
+        end = self._start + self._size
+        if end <= self.capacity:
+            return [(self._start, end)]
+        return [(self._start, self.capacity), (0, end - self.capacity)]
+
+    def _locate(self, ts, right=False):
+        """返回逻辑序号：第一条时间戳 >= ts（right 为 True 时 > ts）的位置"""
+        find = bisect_right if right else bisect_left
+        offset = 0
+        for lo, hi in self._segments():
+            index = find(self._ts, ts, lo, hi)
+            if index < hi:
+                return offset + index - lo
+            offset += hi - lo
+        return offset
+
+    def views(self, start=None, end=None):
+        """时间在 [start, end] 内的数据，按时间顺序返回 [(时间戳 memoryview, 价格 memoryview)]（一至两段，零拷贝）
+
+        返回的视图在下一次 append 覆盖对应位置之前有效；需要长期保存时请拷贝（如 list(view)）。
+        """
+        first = 0 if start is None else self._locate(start)
+        last = self._size if end is None else self._locate(end, right=True)
+        result = []
+        ts_view, price_view = memoryview(self._ts), memoryview(self._prices)
+        offset = 0
+        for lo, hi in self._segments():
+            a = max(first, offset) - offset + lo
+            b = min(last, offset + hi - lo) - offset + lo
+            if b > a:
+                result.append((ts_view[a:b], price_view[a:b]))
+            offset += hi - lo
+        return result
+
+    def _physical(self, index):
+        return (self._start + index) % self.capacity
+
+    def latest(self):
+        """最新一条 (ts, price)；为空时返回 None"""
+        if not self._size:
+            return None
+        pos = self._physical(self._size - 1)
+        return self._ts[pos], self._prices[pos]
+
+    def at(self, ts):
+        """时间 ts 时的价格：时间戳不晚于 ts 的最后一条 (ts, price)；ts 早于全部数据时返回 None"""
+        index = self._locate(ts, right=True) - 1
+        if index < 0:
+            return None
+        pos = self._physical(index)
+        return self._ts[pos], self._prices[pos]
+
+    def prices(self, start=None, end=None):
+        """时间在 [start, end] 内的价格列表（拷贝）"""
+        result = []
+        for _ts, prices in self.views(start, end):
+            result.extend(prices)
+        return result
+
+    @property
+    def nbytes(self):
+        return self._ts.itemsize * len(self._ts) + self._prices.itemsize * len(self._prices)
+
+
+class TickStore:
+    """区服×货币 -> TickRing（线程安全地创建与写入）"""
+
+    def __init__(self, capacity=4096):
+        self.capacity = max(1, int(capacity))
+        self._lock = threading.Lock()
+        self._rings = {}
+
+    def ring(self, currency, server=DEFAULT_SERVER):
+        key = PriceKey(server, currency)
+        ring = self._rings.get(key)
+        if ring is None:
+            with self._lock:
+                ring = self._rings.setdefault(key, TickRing(self.capacity))
+        return ring
+
+    def append(self, server, currency, price, ts=None):
+        if price <= 0:
+            return
+        ring = self.ring(currency, server)
+        with self._lock:
+            ring.append(price, ts)
+
+    def format_stats(self):
+        with self._lock:
+            rings = list(self._rings.items())
+        ticks = sum(len(r) for _k, r in rings)
+        kb = sum(r.nbytes for _k, r in rings) / 1024
+        return f"series={len(rings)} ticks={ticks} capacity={self.capacity} memory={kb:.0f}KB"
+
+
+# 全局实例（价格页写入，图表、统计等组件读取）
+_tick_store = None
+_tick_store_lock = threading.Lock()
+
+
+def get_tick_store():
+    """获取全局内存价格序列（容量见 Config.PRICE_TICKS）"""
+    global _tick_store
+    if _tick_store is None:
+        with _tick_store_lock:
+            if _tick_store is None:
+                _tick_store = TickStore(Config.PRICE_TICKS.get("capacity", 4096))
+    return _tick_store
@@ -789,6 +789,27 @@ class MainWindow(QMainWindow):
         # 停止公告管理器
         self.notice_manager.stop()
         
+        # 关闭价格抓取连接池
+        try:
+            from modules.http_pool import close_http_pool
+            close_http_pool()
+        except Exception:
+            pass
+        
+        # 关闭价格解析进程池
+        try:
+            from modules.price_parse_pool import close_parse_pool
+            close_parse_pool()
+        except Exception:
+            pass
+        
+        # 写完剩余的价格历史
+        try:
+            from modules.price_history import close_price_history
+            close_price_history()
+        except Exception:
+            pass
+        
         # 继续默认的关闭事件处理
         super().closeEvent(event)
     
@@ -19,6 +19,8 @@ try:
 except ImportError:
     pass
 
+from modules.http_compression import accept_encoding, get_transfer_stats
+
 
 class CountdownUpdateDialog(QDialog):
     """带倒计时的更新确认对话框"""
@@ -148,9 +150,11 @@ class UpdateChecker(QObject):
                 try:
                     import requests  # 在工作线程内导入，避免主线程阻塞
                     headers = {
-                        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+                        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+                        'Accept-Encoding': accept_encoding()
                     }
                     resp = requests.get(self.url, headers=headers, timeout=5, verify=True)
+                    get_transfer_stats().record(resp, len(resp.content))
                     info = json.loads(resp.text)
                     latest = info.get("version")
                     url = info.get("download_url")
@@ -222,9 +226,11 @@ class UpdateChecker(QObject):
                 try:
                     import requests
                     headers = {
-                        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+                        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+                        'Accept-Encoding': accept_encoding()
                     }
                     resp = requests.get(self.url, headers=headers, timeout=5)
+                    get_transfer_stats().record(resp, len(resp.content))
                     info = json.loads(resp.text)
                     latest = info.get("version")
                     url = info.get("download_url")
@@ -310,11 +316,13 @@ class UpdateChecker(QObject):
             # 从本地文件读取更新信息
             # 自动检查不显示状态对话框，直接进行检查
             headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+                'Accept-Encoding': accept_encoding()
             }
             
             # 发送请求获取更新信息
             response = requests.get(self.update_url, headers=headers, timeout=5, verify=True)
+            get_transfer_stats().record(response, len(response.content))
             update_info = json.loads(response.text)
             
             latest_version = update_info.get("version")
@@ -390,11 +398,13 @@ class UpdateChecker(QObject):
         try:
             # 发送请求获取最新版本信息
             headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+                'Accept-Encoding': accept_encoding()
             }
             
             # 使用超时参数，避免长时间等待
             response = requests.get(self.update_url, headers=headers, timeout=5)
+            get_transfer_stats().record(response, len(response.content))
             update_info = json.loads(response.text)
             
             # 关闭状态对话框
@@ -484,9 +494,11 @@ class UpdateChecker(QObject):
             
             # 从update.json获取新版本号
             headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+                'Accept-Encoding': accept_encoding()
             }
             response = requests.get(self.update_url, headers=headers, timeout=5)
+            get_transfer_stats().record(response, len(response.content))
             update_info = json.loads(response.text)
             new_version = update_info.get("version", "unknown")
             
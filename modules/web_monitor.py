@@ -17,6 +17,7 @@ from PyQt5.QtGui import QFont
 from PyQt5.Qt import QDesktopServices
 
 from modules.config import Config
+from modules.http_compression import accept_encoding, get_transfer_stats
 
 
 class WebMonitor(QThread):
@@ -58,6 +59,7 @@ class WebMonitor(QThread):
                 'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
                 'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
                 'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
+                'Accept-Encoding': accept_encoding(),
                 'Referer': 'https://www.caimogu.cc/',
                 'Cache-Control': 'max-age=0',
                 'Connection': 'keep-alive',
@@ -70,6 +72,7 @@ class WebMonitor(QThread):
             session.mount('https://', HTTPAdapter(max_retries=retries))
             
             response = session.get(url, headers=headers, timeout=15)
+            get_transfer_stats().record(response, len(response.content))
             soup = BeautifulSoup(response.text, 'html.parser')
             
             # 提取标题